@@ -0,0 +1,3 @@
+# Benchmarks, run from the repository root:
+#   python -m benchmarks            the regression suite, see suite.py
+#   python -m benchmarks.cfr_rule   and the other modules for single studies
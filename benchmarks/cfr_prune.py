@@ -0,0 +1,61 @@
+"""
+Nodes visited per iteration and wall-time to a target exploitability for
+the pruning options of cfr_full.py on CoinToss.
+
+    python -m benchmarks.cfr_prune [target] [iter_max]
+"""
+
+import sys
+import time
+
+from cfr_full import CFRNode, RegretPruning, new_pi
+from cfr_stats import count_nodes
+from coin_toss import CoinToss
+from exploitability import Exploitability
+
+
+def run(pruning, zero_prune, target, iter_max, check_every=10):
+    """
+    Return (iterations, seconds, nodes per iteration, exploitability) when
+    target is reached or iter_max iterations have run. Time spent measuring
+    exploitability and counting nodes is not counted.
+    """
+    root_state = CoinToss()
+    evaluator = Exploitability(root_state)
+    pi = new_pi(pruning=pruning)
+    elapsed = 0
+    nodes = 0
+    expl = None
+    i = 0
+    while i < iter_max:
+        start = time.perf_counter()
+        root_node = CFRNode(state=root_state.clone())
+        root_node.walktree(1, 1, pi, zero_prune)
+        for strategy in pi.values():
+            strategy.end_turn()
+        elapsed += time.perf_counter() - start
+        nodes += count_nodes(root_node)
+        i += 1
+        if i % check_every == 0:
+            expl = evaluator.exploitability(pi)
+            if expl <= target:
+                break
+    return i, elapsed, nodes / i, expl
+
+
+def main(target=1e-2, iter_max=20000):
+    configs = [
+            ("none", None, False),
+            ("zero-reach", None, True),
+            ("regret", RegretPruning(2), False),
+            ("zero-reach+regret", RegretPruning(2), True),
+            ]
+    print('target exploitability %g' % target)
+    print('%-20s %10s %10s %12s %14s' % ('pruning', 'iterations', 'seconds', 'nodes/iter', 'exploitability'))
+    for name, pruning, zero_prune in configs:
+        iterations, seconds, nodes, expl = run(pruning, zero_prune, target, iter_max)
+        print('%-20s %10d %10.3f %12.2f %14.2e' % (name, iterations, seconds, nodes, expl))
+
+
+if __name__ == "__main__":
+    main(*[float(arg) for arg in sys.argv[1:2]], *[int(arg) for arg in sys.argv[2:3]])
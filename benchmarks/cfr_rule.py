@@ -0,0 +1,52 @@
+"""
+Exploitability against wall-clock time for the CFR update rules of
+cfr_rule.py on CoinToss.
+
+    python -m benchmarks.cfr_rule [iter_max]
+"""
+
+import sys
+import time
+
+from cfr_full import cfr, new_pi
+from cfr_rule import VanillaCFR, CFRPlus, LinearCFR, DiscountedCFR
+from coin_toss import CoinToss
+from exploitability import Exploitability
+
+
+def run(rule, iter_max, check_every=10):
+    """
+    Return a list of (iteration, seconds, exploitability) for rule.
+    Time spent measuring exploitability is not counted.
+    """
+    root_state = CoinToss()
+    evaluator = Exploitability(root_state)
+    pi = new_pi(rule)
+    elapsed = 0
+    curve = []
+    for i in range(0, iter_max, check_every):
+        start = time.perf_counter()
+        cfr(root_state, check_every, pi)
+        elapsed += time.perf_counter() - start
+        curve.append((i + check_every, elapsed, evaluator.exploitability(pi)))
+    return curve
+
+
+def main(iter_max=2000):
+    targets = [1e-1, 1e-2, 1e-3, 1e-4]
+    print('%-42s %s' % ('rule', '  '.join('%16s' % ('expl<%g' % t) for t in targets)))
+    for rule in [VanillaCFR(), CFRPlus(), LinearCFR(), DiscountedCFR()]:
+        curve = run(rule, iter_max)
+        cells = []
+        for target in targets:
+            hit = [(i, s) for (i, s, e) in curve if e < target]
+            if hit:
+                cells.append('%6d it %6.3fs' % hit[0])
+            else:
+                cells.append('%16s' % '-')
+        print('%-42s %s' % (rule, '  '.join(cells)))
+        print('%-42s final exploitability %.2e after %d iterations' % ('', curve[-1][2], curve[-1][0]))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,50 @@
+"""
+Clone cost and per-state memory of the compact __slots__ states against
+the classes they stand in for.
+
+    python -m benchmarks.compact_state [count]
+
+States are taken a few plies into the game. Memory is what tracemalloc
+sees allocated per state when count clones are kept alive.
+"""
+
+import sys
+import time
+import tracemalloc
+
+import coin_toss
+import uct_state
+from benchmarks.suite import best_time, mid_game_state
+
+
+PAIRS = [
+        ("coin_toss.CoinToss", coin_toss.CoinToss, coin_toss.CompactCoinToss),
+        ("uct_state.CoinToss", uct_state.CoinToss, uct_state.CompactCoinToss),
+        ("NimState(15)", lambda: uct_state.NimState(15), lambda: uct_state.CompactNimState(15)),
+        ("OXOState", uct_state.OXOState, uct_state.CompactOXOState),
+        ("NaivePokerState", uct_state.NaivePokerState, uct_state.CompactNaivePokerState),
+        ]
+
+
+def bytes_per_state(state, count):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    clones = [state.clone() for i in range(count)]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    # the list holding the clones is not part of a state
+    return (after - before - sys.getsizeof(clones)) / len(clones)
+
+
+def main(count=100000):
+    print('%-20s %-8s %14s %12s' % ('game', 'class', 'clones/s', 'bytes/state'))
+    for name, make_state, make_compact in PAIRS:
+        for label, make in [("plain", make_state), ("compact", make_compact)]:
+            state = mid_game_state(make, plies=2)
+            seconds = best_time(lambda: [state.clone() for i in range(count)], 5)
+            print('%-20s %-8s %14.0f %12.1f' % (name, label, count / seconds,
+                                                 bytes_per_state(state, count)))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
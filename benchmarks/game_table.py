@@ -0,0 +1,59 @@
+"""
+Compiled state tables against the game classes they are compiled from.
+
+    python -m benchmarks.game_table [uct_iterations] [cfr_iterations]
+
+For each small game: the time to compile the tables and to load them from
+the cache, UCT iterations/s on the state and on the tables, and, for the
+imperfect information games, CFR iterations/s of the two.
+"""
+
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks.suite import best_time
+from cfr_full import cfr
+from coin_toss import CoinToss
+from game_table import TableState, TableUCTSearch, compile_game
+from uct import UCTSearch
+from uct_state import NimState, OXOState, NaivePokerState
+
+
+GAMES = [
+        ("NimState(15)", lambda: NimState(15), False),
+        ("OXOState", OXOState, False),
+        ("NaivePokerState", NaivePokerState, True),
+        ("CoinToss", CoinToss, True),
+        ]
+
+
+def main(uct_iterations=5000, cfr_iterations=100):
+    cache_dir = tempfile.mkdtemp()
+    try:
+        print('%-16s %10s %10s %12s %12s %10s %10s' % ('game', 'compile s', 'load s', 'uct state',
+                                                        'uct table', 'cfr state', 'cfr table'))
+        for name, make_state, imperfect in GAMES:
+            start = time.perf_counter()
+            compile_game(make_state(), cache_dir)
+            compile_seconds = time.perf_counter() - start
+            start = time.perf_counter()
+            table = compile_game(make_state(), cache_dir)
+            load_seconds = time.perf_counter() - start
+
+            uct_state = uct_iterations / best_time(lambda: UCTSearch(make_state()).run(uct_iterations), 3)
+            uct_table = uct_iterations / best_time(
+                    lambda: TableUCTSearch(TableState(table)).run(uct_iterations), 3)
+            cfr_state = cfr_table = float('nan')
+            if imperfect:
+                cfr_state = cfr_iterations / best_time(lambda: cfr(make_state(), cfr_iterations), 3)
+                cfr_table = cfr_iterations / best_time(lambda: cfr(TableState(table), cfr_iterations), 3)
+            print('%-16s %10.3f %10.3f %12.0f %12.0f %10.0f %10.0f' % (
+                    name, compile_seconds, load_seconds, uct_state, uct_table, cfr_state, cfr_table))
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,92 @@
+"""
+Cyclic garbage collector pauses during UCT and CFR runs.
+
+    python -m benchmarks.gc_pause [uct_iterations] [cfr_iterations]
+
+Every case runs once with the collector on as usual and once inside
+gc_quiet.suspend_gc(), and reports the run time, the number of collections
+and the total and longest pause they took (timed through gc.callbacks),
+and the objects a full collection finds unreachable afterwards, i.e. what
+was left in reference cycles.
+"""
+
+import gc
+import random
+import sys
+import time
+
+from benchmarks.suite import SEED
+from cfr_full import CFRNode, new_pi
+from gc_quiet import suspend_gc
+from random_game import RandomGame
+from uct import UCTSearch
+from uct_state import OXOState, OthelloState
+
+
+class PauseTimer(object):
+
+    def __init__(self):
+        self.pauses = []
+        self.start = None
+
+    def __call__(self, phase, info):
+        if phase == "start":
+            self.start = time.perf_counter()
+        elif self.start is not None:
+            self.pauses.append(time.perf_counter() - self.start)
+            self.start = None
+
+
+def uct_case(make_state, iterations):
+    def run():
+        search = UCTSearch(make_state())
+        search.run(iterations)
+        return search.best_move()
+    return run
+
+
+def cfr_case(make_state, iterations):
+    def run():
+        root_state = make_state()
+        pi = new_pi(root_state=root_state)
+        for i in range(iterations):
+            root_node = CFRNode(state=root_state.clone())
+            root_node.walktree(1, 1, pi)
+            for strategy in pi.values():
+                strategy.end_turn()
+    return run
+
+
+def measure(run, quiet):
+    gc.collect()
+    timer = PauseTimer()
+    gc.callbacks.append(timer)
+    try:
+        random.seed(SEED)
+        start = time.perf_counter()
+        with suspend_gc(quiet):
+            run()
+        seconds = time.perf_counter() - start
+    finally:
+        gc.callbacks.remove(timer)
+    return seconds, timer.pauses, gc.collect()
+
+
+def main(uct_iterations=20000, cfr_iterations=20):
+    cases = [
+            ("uct/OXOState", uct_case(OXOState, uct_iterations)),
+            ("uct/OthelloState(6)", uct_case(lambda: OthelloState(6), uct_iterations // 10)),
+            ("cfr/RandomGame(4,2,3)", cfr_case(lambda: RandomGame(4, 2, 3), cfr_iterations)),
+            ]
+    print('%-24s %-6s %9s %12s %14s %14s %12s' % ('case', 'gc', 'seconds', 'collections',
+                                                   'total pause ms', 'max pause ms', 'unreachable'))
+    for name, run in cases:
+        for label, quiet in [("on", False), ("quiet", True)]:
+            seconds, pauses, unreachable = measure(run, quiet)
+            print('%-24s %-6s %9.3f %12d %14.1f %14.2f %12d' % (
+                    name, label, seconds, len(pauses), sum(pauses) * 1000,
+                    max(pauses, default=0) * 1000, unreachable))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,51 @@
+"""
+ISMCTS throughput against the number of worker processes.
+
+    python -m benchmarks.ismcts [iter_max] [max_workers]
+
+Reports iterations/sec for 1, 2, 4, ... workers up to max_workers
+(the number of cores by default) on NaivePokerState and CoinToss, and the
+speed-up over a single worker. Pool start-up is included in the time, as
+it is for a real call to ismcts().
+"""
+
+import multiprocessing
+import sys
+import time
+
+from ismcts import ismcts
+from uct_state import CoinToss, NaivePokerState
+
+
+def games():
+    coin = CoinToss()
+    coin.do_move("toss")
+    coin.do_move("play")
+    return [("NaivePokerState", NaivePokerState()), ("CoinToss after play", coin)]
+
+
+def main(iter_max=20000, max_workers=None):
+    if max_workers is None:
+        max_workers = multiprocessing.cpu_count()
+    counts = []
+    workers = 1
+    while workers <= max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != max_workers:
+        counts.append(max_workers)
+    print('%d cores, %d iterations' % (multiprocessing.cpu_count(), iter_max))
+    print('%-22s %8s %14s %9s' % ('game', 'workers', 'iterations/s', 'speed-up'))
+    for name, state in games():
+        single = None
+        for workers in counts:
+            start = time.perf_counter()
+            ismcts(state, iter_max, workers=workers, seed=0)
+            rate = iter_max / (time.perf_counter() - start)
+            if single is None:
+                single = rate
+            print('%-22s %8d %14.0f %8.2fx' % (name, workers, rate, rate / single))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
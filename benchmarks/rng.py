@@ -0,0 +1,38 @@
+"""
+Rollout throughput with the global random module against rng.BlockRandom.
+
+    python -m benchmarks.rng [count]
+"""
+
+import random
+import sys
+
+from benchmarks.suite import GAMES, best_time
+from rng import BlockRandom
+
+
+def rollout(state, rng):
+    while state.get_moves():
+        state.do_move(rng.choice(state.get_moves()))
+
+
+def main(count=2000):
+    sources = [("random.choice", lambda: random), ("BlockRandom", lambda: BlockRandom(0))]
+    moves = list(range(7))
+    print('%-20s %-14s %14s' % ('case', 'source', 'per second'))
+    for label, make_rng in sources:
+        rng = make_rng()
+        n = count * 500
+        seconds = best_time(lambda: [rng.choice(moves) for i in range(n)], 5)
+        print('%-20s %-14s %14.0f' % ('choice()', label, n / seconds))
+    for name, make_state in GAMES.items():
+        n = count // 20 if name.startswith("OthelloState") else count
+        root_state = make_state()
+        for label, make_rng in sources:
+            rng = make_rng()
+            seconds = best_time(lambda: [rollout(root_state.clone(), rng) for i in range(n)], 5)
+            print('%-20s %-14s %14.0f' % (name, label, n / seconds))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,62 @@
+"""
+UCT on OthelloState with rollouts cut after a number of plies and scored by
+othello_eval.OthelloEvaluator, against full rollouts.
+
+    python -m benchmarks.rollout_cutoff [size] [iterations] [games]
+
+For every cutoff: UCT iterations/s from a few mid-game positions, and the
+score (win 1, draw 0.5) of a player using the cutoff against one playing
+full rollouts with the same number of iterations per move, over games
+with alternating colours.
+"""
+
+import random
+import sys
+
+from benchmarks.suite import SEED, best_time, mid_game_state
+from othello_eval import OthelloEvaluator
+from uct import UCTSearch
+from uct_state import OthelloState
+
+
+CUTOFFS = [None, 20, 10, 4, 0]
+
+
+def best_move(state, iterations, cutoff, evaluator):
+    search = UCTSearch(state, rollout_depth=cutoff, evaluator=evaluator if cutoff is not None else None)
+    search.run(iterations)
+    return search.best_move()
+
+
+def play(size, iterations, cutoff, evaluator, capped_player):
+    """
+    Result of capped_player in a game against full rollouts.
+    """
+    state = OthelloState(size)
+    while state.get_moves():
+        mover = 3 - state.player_just_moved
+        depth = cutoff if mover == capped_player else None
+        state.do_move(best_move(state, iterations, depth, evaluator))
+    return state.get_result(capped_player)
+
+
+def main(size=8, iterations=100, games=4):
+    evaluator = OthelloEvaluator(size)
+    positions = [mid_game_state(lambda: OthelloState(size), plies) for plies in (4, 16, 28)]
+    print('%-8s %14s %10s' % ('cutoff', 'iterations/s', 'score'))
+    for cutoff in CUTOFFS:
+        seconds = best_time(lambda: [best_move(state, iterations, cutoff, evaluator)
+                                     for state in positions], 3)
+        rate = iterations * len(positions) / seconds
+        if cutoff is None:
+            print('%-8s %14.0f %10s' % ('full', rate, '-'))
+            continue
+        score = 0
+        for game in range(games):
+            random.seed(SEED + game)
+            score += play(size, iterations, cutoff, evaluator, 1 + game % 2)
+        print('%-8d %14.0f %10.2f' % (cutoff, rate, score / games))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
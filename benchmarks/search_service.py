@@ -0,0 +1,60 @@
+"""
+Load generator for search_service.SearchService.
+
+    python -m benchmarks.search_service [moves_per_game] [iter_max] [workers]
+
+For a growing number of concurrent games, every game asks the service for
+UCT moves on OXOState (the opponent plays at random) until it has made
+moves_per_game moves. Reports p50/p99 move latency and moves/sec, with
+plain per-search rollouts and with the batched RolloutEngine.
+"""
+
+import asyncio
+import random
+import sys
+import time
+
+from search_service import RolloutEngine, SearchService
+from uct_state import OXOState
+
+
+async def play(service, moves, iter_max, latencies, rng):
+    state = OXOState()
+    for i in range(moves):
+        if not state.get_moves():
+            state = OXOState()
+        start = time.perf_counter()
+        move = await service.request_move(state, iter_max)
+        latencies.append(time.perf_counter() - start)
+        state.do_move(move)
+        if state.get_moves():
+            state.do_move(rng.choice(state.get_moves()))
+
+
+async def run(games, moves, iter_max, workers, engine):
+    latencies = []
+    async with SearchService(workers=workers, slice_iterations=max(1, iter_max // 4),
+                             engine=engine) as service:
+        # the first slice on a worker pays for its imports
+        await asyncio.gather(*[service.request_move(OXOState(), 1)
+                               for w in range(service.worker_count)])
+        start = time.perf_counter()
+        await asyncio.gather(*[play(service, moves, iter_max, latencies, random.Random(g))
+                               for g in range(games)])
+        elapsed = time.perf_counter() - start
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    return p50, p99, len(latencies) / elapsed
+
+
+def main(moves=10, iter_max=200, workers=None):
+    print('%-8s %6s %10s %10s %10s' % ('engine', 'games', 'p50 ms', 'p99 ms', 'moves/s'))
+    for label, engine in [("plain", None), ("batched", RolloutEngine())]:
+        for games in [1, 4, 16, 64]:
+            p50, p99, rate = asyncio.run(run(games, moves, iter_max, workers, engine))
+            print('%-8s %6d %10.1f %10.1f %10.1f' % (label, games, p50 * 1000, p99 * 1000, rate))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,60 @@
+"""
+Sequential Halving at the root against UCB1, at equal iteration counts.
+
+    python -m benchmarks.sequential_halving [size] [games] [iterations ...]
+
+For every budget, the score (win 1, draw 0.5) of the Sequential Halving
+player against the UCB1 player over games of OthelloState(size) with
+alternating colours, and how often each policy picks the move a search
+with 20 times the budget prefers, over a set of mid-game positions.
+"""
+
+import random
+import sys
+
+from benchmarks.suite import SEED, mid_game_state
+from uct import UCTSearch
+from uct_state import OthelloState
+
+
+def best_move(state, iterations, root_policy):
+    search = UCTSearch(state)
+    if root_policy == "sequential_halving":
+        search.run_sequential_halving(iterations)
+    else:
+        search.run(iterations)
+    return search.best_move()
+
+
+def play(size, iterations, halving_player):
+    state = OthelloState(size)
+    while state.get_moves():
+        mover = 3 - state.player_just_moved
+        policy = "sequential_halving" if mover == halving_player else "ucb1"
+        state.do_move(best_move(state, iterations, policy))
+    return state.get_result(halving_player)
+
+
+def main(size=6, games=10, *budgets):
+    budgets = budgets or (50, 100, 200)
+    positions = [mid_game_state(lambda: OthelloState(size), plies) for plies in range(4, 24, 2)]
+    positions = [state for state in positions if len(state.get_moves()) > 1]
+    print('%-10s %10s %12s %12s' % ('iterations', 'SH score', 'UCB1 agree', 'SH agree'))
+    for iterations in budgets:
+        random.seed(SEED)
+        reference = [best_move(state, iterations * 20, "ucb1") for state in positions]
+        agree = {}
+        for policy in ["ucb1", "sequential_halving"]:
+            random.seed(SEED)
+            agree[policy] = sum(best_move(state, iterations, policy) == move
+                                for state, move in zip(positions, reference)) / len(positions)
+        score = 0
+        for game in range(games):
+            random.seed(SEED + game)
+            score += play(size, iterations, 1 + game % 2)
+        print('%-10d %10.2f %12.2f %12.2f' % (iterations, score / games,
+                                               agree["ucb1"], agree["sequential_halving"]))
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,263 @@
+"""
+Benchmark suite for the UCT and CFR hot paths.
+
+    python -m benchmarks [--quick] [--output results.json]
+                         [--baseline benchmarks/baseline.json]
+                         [--threshold 0.2] [--update-baseline]
+
+Every case runs a fixed amount of seeded work and keeps the best of a few
+repeats. Results are written as JSON and every metric is compared against
+the baseline file; the run fails when any metric is worse than the
+baseline by more than the threshold (a fraction), and also when there is
+no baseline to compare against. Baselines are machine specific, so none
+is committed: write one with
+
+    python -m benchmarks --update-baseline
+
+on the machine that runs the comparison, and again whenever a change is
+meant to move the numbers.
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from cfr_full import CFRNode, new_pi
+from coin_toss import CoinToss
+from random_game import RandomGame
+from uct import UCTSearch, uct
+from uct_state import NimState, OXOState, MNKState, OthelloState, NaivePokerState
+
+
+SEED = 12345
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+GAMES = {
+        "NimState(15)":lambda: NimState(15),
+        "OXOState":OXOState,
+        "MNKState(3,3,3)":MNKState,
+        "MNKState(15,15,5)":lambda: MNKState(15, 15, 5),
+        "OthelloState(4)":lambda: OthelloState(4),
+        "OthelloState(6)":lambda: OthelloState(6),
+        "OthelloState(8)":lambda: OthelloState(8),
+        "NaivePokerState":NaivePokerState,
+        }
+
+CFR_GAMES = {
+        "CoinToss":CoinToss,
+        "RandomGame(3,2,2)":lambda: RandomGame(3, 2, 2),
+        "RandomGame(4,2,3)":lambda: RandomGame(4, 2, 3),
+        }
+
+
+def best_time(func, repeat, setup=None):
+    """
+    Seed the global random module, run func and return the smallest wall
+    time over repeat runs. If setup is given, its result is passed to func
+    and the time it takes is not counted. Like timeit, the cyclic garbage
+    collector is off while timing.
+    """
+    best = None
+    for i in range(repeat):
+        random.seed(SEED)
+        arg = setup() if setup is not None else None
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            if setup is not None:
+                func(arg)
+            else:
+                func()
+            elapsed = time.perf_counter() - start
+        finally:
+            gc.enable()
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def rollout(state):
+    while state.get_moves():
+        state.do_move(random.choice(state.get_moves()))
+
+
+def mid_game_state(make_state, plies=4):
+    """
+    A state a few random plies into the game, where move generation is
+    typical rather than trivial.
+    """
+    rng = random.Random(SEED)
+    state = make_state()
+    for i in range(plies):
+        moves = state.get_moves()
+        if not moves:
+            break
+        state.do_move(rng.choice(moves))
+    return state
+
+
+def bench_rollouts(results, quick, repeat):
+    for name, make_state in GAMES.items():
+        count = 20 if quick else 200
+        if name.startswith("OthelloState"):
+            count //= 4
+        root_state = make_state()
+        seconds = best_time(lambda: [rollout(root_state.clone()) for i in range(count)], repeat)
+        results["rollout/%s" % name] = metric(count / seconds, "rollouts/s")
+
+
+def bench_micro(results, quick, repeat):
+    for name, make_state in GAMES.items():
+        count = 2000 if quick else 20000
+        if name.startswith("OthelloState"):
+            count //= 10
+        state = mid_game_state(make_state)
+        move = state.get_moves()[0]
+        seconds = best_time(lambda: [state.clone() for i in range(count)], repeat)
+        results["micro/%s/clone" % name] = metric(count / seconds, "calls/s")
+        seconds = best_time(lambda: [state.get_moves() for i in range(count)], repeat)
+        results["micro/%s/get_moves" % name] = metric(count / seconds, "calls/s")
+        seconds = best_time(lambda clones: [st.do_move(move) for st in clones], repeat,
+                            lambda: [state.clone() for i in range(count)])
+        results["micro/%s/do_move" % name] = metric(count / seconds, "calls/s")
+
+
+def bench_uct(results, quick, repeat):
+    cases = [("OXOState", OXOState, [100, 1000]),
+             ("OthelloState(6)", lambda: OthelloState(6), [100, 500]),
+             ("MNKState(15,15,5)", lambda: MNKState(15, 15, 5), [100, 500])]
+    for name, make_state, iter_maxes in cases:
+        for iter_max in iter_maxes:
+            if quick:
+                iter_max //= 10
+            root_state = make_state()
+
+            def search():
+                # uct() reports on stdout; keep it out of the results
+                with contextlib.redirect_stdout(io.StringIO()):
+                    uct(root_state, iter_max)
+
+            seconds = best_time(search, repeat)
+            results["uct/%s/%d/iterations" % (name, iter_max)] = metric(iter_max / seconds, "iterations/s")
+            # the tree alone: uct() also builds the text of the tree it prints
+            random.seed(SEED)
+            tracemalloc.start()
+            UCTSearch(root_state).run(iter_max)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # a search adds at most one node per iteration
+            results["uct/%s/%d/memory" % (name, iter_max)] = metric(
+                    peak / iter_max, "peak bytes/node", higher_is_better=False)
+
+
+def bench_cfr(results, quick, repeat):
+    for name, make_state in CFR_GAMES.items():
+        root_state = make_state()
+        iter_max = 20 if name != "CoinToss" else 500
+        if quick:
+            iter_max //= 5
+
+        def run(pi):
+            for i in range(iter_max):
+                root_node = CFRNode(state=root_state.clone())
+                root_node.walktree(1, 1, pi)
+                for strategy in pi.values():
+                    strategy.end_turn()
+
+        seconds = best_time(run, repeat, lambda: new_pi(root_state=root_state))
+        results["cfr/%s" % name] = metric(iter_max / seconds, "iterations/s")
+
+
+BENCHMARKS = [bench_rollouts, bench_micro, bench_uct, bench_cfr]
+
+
+def metric(value, unit, higher_is_better=True):
+    return {"value":value, "unit":unit, "higher_is_better":higher_is_better}
+
+
+def run_suite(quick=False, repeat=5, only=None):
+    results = {}
+    for bench in BENCHMARKS:
+        if only and not any(name in bench.__name__ for name in only):
+            continue
+        bench(results, quick, repeat)
+    return {
+            "meta":{
+                "python":platform.python_version(),
+                "platform":platform.platform(),
+                "seed":SEED,
+                "quick":quick,
+                "repeat":repeat,
+                "time":time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+            "results":results,
+            }
+
+
+def compare(report, baseline, threshold):
+    """
+    Return the list of (name, baseline value, value, change) for metrics
+    that are worse than baseline by more than threshold.
+    """
+    regressions = []
+    for name, base in baseline["results"].items():
+        if name not in report["results"]:
+            continue
+        value = report["results"][name]["value"]
+        change = (value - base["value"]) / base["value"]
+        if not base["higher_is_better"]:
+            change = -change
+        if change < -threshold:
+            regressions.append((name, base["value"], value, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--quick", action="store_true", help="smaller workloads")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="*", help="run the benchmarks whose name contains one of these")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--threshold", type=float, default=0.2)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    report = run_suite(args.quick, args.repeat, args.only)
+    for name, result in report["results"].items():
+        print("%-45s %14.1f %s" % (name, result["value"], result["unit"]))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    if args.update_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print("baseline written to %s" % args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print("ERROR: no baseline at %s, nothing was compared; write one with "
+              "python -m benchmarks --update-baseline" % args.baseline, file=sys.stderr)
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+    for name, base, value, change in regressions:
+        print("REGRESSION %-34s %14.1f -> %.1f (%+.0f%%)" % (name, base, value, change * 100))
+    if regressions:
+        return 1
+    print("no regressions beyond %.0f%%" % (args.threshold * 100))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,250 @@
+
+# Checkpoints of CFR strategy tables.
+#
+# A checkpoint directory holds one sub-directory per snapshot plus a LATEST
+# file naming the newest complete one:
+#
+#   LATEST
+#   turn-00001000/index.json
+#   turn-00001000/regret-1.npy  pi_sum-1.npy  average-1.npy  info_turn-1.npy
+#   turn-00001000/regret-2.npy  ...
+#
+# Each table is an (infos x actions) array whose rows and columns follow the
+# info_list and action_list stored in index.json, together with the columns
+# of the legal actions of every info (entries of illegal actions are 0), the
+# turn, the update rule and the pruning settings. A snapshot is written under a
+# temporary name and renamed into place before LATEST is replaced, so an
+# interrupted run always leaves the previous snapshot readable.
+#
+# average-<player>.npy holds the normalized average strategy, so a serving
+# process can memory-map just that with load_average_pi.
+
+import json
+import os
+import shutil
+
+import numpy as np
+
+import cfr_full
+import cfr_rule
+from cfr_full import StrategyState
+
+
+LATEST = "LATEST"
+
+
+def _encode_key(key):
+    # information sets and actions only need to be JSON values; tuples are
+    # written as lists and turned back into tuples by _decode_key
+    if isinstance(key, tuple):
+        return [_encode_key(k) for k in key]
+    return key
+
+
+def _decode_key(key):
+    if isinstance(key, list):
+        return tuple(_decode_key(k) for k in key)
+    return key
+
+
+def _encode_object(obj):
+    if obj is None:
+        return None
+    return {"class":obj.__class__.__name__, "params":obj.__dict__}
+
+
+def _decode_object(data, module):
+    if data is None:
+        return None
+    cls = getattr(module, data["class"])
+    obj = cls.__new__(cls)
+    obj.__dict__.update(data["params"])
+    return obj
+
+
+def _table(strategy, table):
+    return np.array([[table[info].get(action, 0) for action in strategy.action_list]
+                     for info in strategy.info_list], dtype=np.float64)
+
+
+def _info_columns(strategy):
+    column = {action:j for j, action in enumerate(strategy.action_list)}
+    return [[column[action] for action in strategy.info_actions[info]] for info in strategy.info_list]
+
+
+def _info_actions(info_list, action_list, entry):
+    # snapshots written before info_actions was stored allow every action
+    columns = entry.get("info_actions")
+    if columns is None:
+        return {info:action_list for info in info_list}
+    return {info:[action_list[j] for j in columns[i]] for i, info in enumerate(info_list)}
+
+
+def _save_array(path, array):
+    with open(path, "wb") as f:
+        np.save(f, array)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _write_latest(directory, name):
+    tmp = os.path.join(directory, ".%s.tmp-%d" % (LATEST, os.getpid()))
+    with open(tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, os.path.join(directory, LATEST))
+
+
+def save_checkpoint(pi, directory, keep=2):
+    """
+    Write a snapshot of the strategy tables pi into directory and make it
+    the latest one. Only the keep newest snapshots are kept.
+    Must be called between turns. A snapshot of the same turn left by an
+    earlier run is replaced.
+    """
+    os.makedirs(directory, exist_ok=True)
+    turn = pi[1].turn
+    name = "turn-%08d" % turn
+    final = os.path.join(directory, name)
+    tmp = os.path.join(directory, ".%s.tmp-%d" % (name, os.getpid()))
+    if os.path.exists(tmp):
+        shutil.rmtree(tmp)
+    os.makedirs(tmp)
+    index = {"turn":turn, "players":{}}
+    for player, strategy in pi.items():
+        index["players"][str(player)] = {
+                "info_list":[_encode_key(info) for info in strategy.info_list],
+                "action_list":[_encode_key(action) for action in strategy.action_list],
+                "info_actions":_info_columns(strategy),
+                "info_histories":[strategy.info_histories[info] for info in strategy.info_list],
+                "turn":strategy.turn,
+                "rule":_encode_object(strategy.rule),
+                "pruning":_encode_object(strategy.pruning),
+                }
+        average = [strategy.get_average_pi(info) for info in strategy.info_list]
+        tables = {
+                "regret":_table(strategy, strategy.regret),
+                "pi_sum":_table(strategy, strategy.pi_sum),
+                "average":np.array([[a.get(action, 0) for action in strategy.action_list] for a in average],
+                                   dtype=np.float64),
+                "info_turn":np.array([strategy.info_turn[info] for info in strategy.info_list],
+                                     dtype=np.int64),
+                }
+        if strategy.pruning is not None:
+            tables["prune_until"] = _table(strategy, strategy.prune_until).astype(np.int64)
+        for table_name, array in tables.items():
+            _save_array(os.path.join(tmp, "%s-%s.npy" % (table_name, player)), array)
+    with open(os.path.join(tmp, "index.json"), "w") as f:
+        json.dump(index, f)
+        f.flush()
+        os.fsync(f.fileno())
+    old = None
+    if os.path.exists(final):
+        # set aside, and only removed once LATEST no longer names it
+        old = os.path.join(directory, ".%s.old-%d" % (name, os.getpid()))
+        if os.path.exists(old):
+            shutil.rmtree(old)
+        os.rename(final, old)
+    os.rename(tmp, final)
+    _write_latest(directory, name)
+    if old is not None:
+        shutil.rmtree(old)
+    snapshots = sorted(n for n in os.listdir(directory) if n.startswith("turn-"))
+    for old in snapshots[:-keep]:
+        shutil.rmtree(os.path.join(directory, old))
+    return final
+
+
+def latest_checkpoint(directory):
+    """
+    Path of the newest complete snapshot in directory, or None.
+    """
+    try:
+        with open(os.path.join(directory, LATEST)) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return os.path.join(directory, name)
+
+
+def _load_index(directory):
+    path = latest_checkpoint(directory)
+    if path is None:
+        raise FileNotFoundError("no checkpoint in %s" % directory)
+    with open(os.path.join(path, "index.json")) as f:
+        return path, json.load(f)
+
+
+def load_checkpoint(directory):
+    """
+    Rebuild the strategy tables pi from the latest snapshot in directory,
+    ready to continue the run.
+    """
+    path, index = _load_index(directory)
+    pi = {}
+    for key, entry in index["players"].items():
+        player = int(key)
+        info_list = [_decode_key(info) for info in entry["info_list"]]
+        action_list = [_decode_key(action) for action in entry["action_list"]]
+        info_actions = _info_actions(info_list, action_list, entry)
+        rule = _decode_object(entry["rule"], cfr_rule)
+        pruning = _decode_object(entry["pruning"], cfr_full)
+        histories = entry.get("info_histories")
+        info_histories = dict(zip(info_list, histories)) if histories is not None else None
+        strategy = StrategyState(info_list, action_list, rule, pruning, info_actions, info_histories)
+        column = {action:j for j, action in enumerate(action_list)}
+        strategy.turn = entry["turn"]
+        names = ["regret", "pi_sum", "info_turn"]
+        if pruning is not None:
+            names += ["prune_until"]
+        tables = {name:np.load(os.path.join(path, "%s-%s.npy" % (name, player))) for name in names}
+        for i, info in enumerate(info_list):
+            strategy.info_turn[info] = int(tables["info_turn"][i])
+            for action in info_actions[info]:
+                j = column[action]
+                strategy.regret[info][action] = float(tables["regret"][i, j])
+                strategy.pi_sum[info][action] = float(tables["pi_sum"][i, j])
+                if pruning is not None:
+                    strategy.prune_until[info][action] = int(tables["prune_until"][i, j])
+            strategy.update_pi(info)
+        pi[player] = strategy
+    return pi
+
+
+class AverageStrategy(object):
+    """
+    Read-only average strategy of one player backed by a memory-mapped
+    array. Offers the get_average_pi of StrategyState, so it can stand in
+    for it, e.g. in exploitability.Exploitability.
+    """
+
+    def __init__(self, info_list, action_list, average, info_actions=None):
+        self.info_list = info_list
+        self.action_list = action_list
+        if info_actions is None:
+            info_actions = {info:action_list for info in info_list}
+        self.info_actions = info_actions
+        self.info_index = {info:i for i, info in enumerate(info_list)}
+        self.column = {action:j for j, action in enumerate(action_list)}
+        self.average = average
+
+    def get_average_pi(self, info):
+        row = self.average[self.info_index[info]]
+        return {action:float(row[self.column[action]]) for action in self.info_actions[info]}
+
+
+def load_average_pi(directory):
+    """
+    Memory-map the average strategies of the latest snapshot in directory.
+    Return {player: AverageStrategy}.
+    """
+    path, index = _load_index(directory)
+    pi = {}
+    for key, entry in index["players"].items():
+        average = np.load(os.path.join(path, "average-%s.npy" % key), mmap_mode="r")
+        info_list = [_decode_key(info) for info in entry["info_list"]]
+        action_list = [_decode_key(action) for action in entry["action_list"]]
+        pi[int(key)] = AverageStrategy(info_list, action_list, average,
+                                       _info_actions(info_list, action_list, entry))
+    return pi
@@ -1,19 +1,121 @@
 
 from coin_toss import CoinToss
+from cfr_rule import VanillaCFR
+from exploitability import Exploitability
+from game_table import TableState, state_key, walk_table
+from gc_quiet import suspend_gc
+from cfr_stats import count_nodes, infoset_updates
 import enum
+import time
+
+
+class RegretPruning(object):
+    """
+    Settings for regret-based pruning (Brown & Sandholm, 2015).
+    Every history of an information set adds at most utility_range times a
+    reach of at most one to the regret of an action per iteration, so an
+    action with negative regret keeps a regret of at most zero for
+    -regret / (utility_range * histories) iterations, histories being the
+    number of histories in the information set. The action is put aside
+    for that many iterations, but never for more than revisit in a row.
+    While it is put aside and its probability is zero, CFRNode.walktree
+    and walk_table skip its subtree and collect its regret with the
+    optimistic value of the subtree (see optimistic_value) in place of its
+    counterfactual value. That value is at least the value of a best
+    response, so the regrets stay upper bounds of the unpruned ones, which
+    keeps the convergence guarantee of CFR.
+    """
+
+    def __init__(self, utility_range, revisit=100):
+        self.utility_range = utility_range
+        self.revisit = revisit
+
+    def prune_turns(self, regret, histories):
+        """
+        Number of turns an action with accumulated regret, in an information
+        set of histories histories, is put aside for.
+        """
+        if regret >= 0:
+            return 0
+        return min(int(-regret / (self.utility_range * histories)), self.revisit)
+
+
+def optimistic_value(state, player, cache):
+    """
+    Upper bound of player's value of state under any strategies: results
+    averaged over chance moves and maximized over the moves of both
+    players. Values are memoized in cache by state_key.
+    """
+    key = state_key(state)
+    value = cache.get(key)
+    if value is not None:
+        return value
+    to_move = state.get_player_next_moved()
+    if to_move is None:
+        value = state.get_result(player)
+    else:
+        values = []
+        for move in state.get_moves():
+            next_state = state.clone()
+            next_state.do_move(move)
+            values.append(optimistic_value(next_state, player, cache))
+        value = sum(values) / len(values) if to_move == 0 else max(values)
+    cache[key] = value
+    return value
 
 
 class StrategyState(object):
-    def __init__(self, info_list, action_list):
+    def __init__(self, info_list, action_list, rule=None, pruning=None, info_actions=None,
+                 info_histories=None):
         self.info_list = info_list
+        # every action of the player, in the order first met
         self.action_list = action_list
-        self.pi = {info:{action:1/len(action_list) for action in action_list} for info in info_list}
-        self.regret = {info:{action:0 for action in action_list} for info in info_list}
+        # legal actions of each info; all of action_list if not given
+        if info_actions is None:
+            info_actions = {info:action_list for info in info_list}
+        self.info_actions = info_actions
+        # update rule, see cfr_rule.py
+        self.rule = rule if rule is not None else VanillaCFR()
+        self.pi = {info:{action:1/len(info_actions[info]) for action in info_actions[info]}
+                   for info in info_list}
+        self.regret = self.new_table()
+        # regret collected during the current turn, folded into regret by end_turn
+        self.regret_delta = self.new_table()
+        # reach-weighted sum of the strategies played, for the average strategy
+        self.pi_sum = self.new_table()
         self.info_turn = {info:0 for info in info_list}
+        # current iteration, starting from 1
+        self.turn = 1
+        # regret-based pruning, see RegretPruning; None to never prune
+        self.pruning = pruning
+        # histories in each info, for the pruning windows; one if not given
+        if info_histories is None:
+            info_histories = {info:1 for info in info_list}
+        self.info_histories = info_histories
+        # first turn on which an action is traversed again
+        self.prune_until = self.new_table()
+        # optimistic_value of the states below skipped moves, by state_key
+        self.optimistic = {}
+        # visits of each info in the current turn
+        self.turn_visits = {info:0 for info in info_list}
+
+    def new_table(self):
+        """
+        {info: {action: 0}} over the legal actions of every info.
+        """
+        return {info:{action:0 for action in self.info_actions[info]} for info in self.info_list}
 
     def get_pi(self, info, action):
         return self.pi[info][action]
 
+    def get_average_pi(self, info):
+        pi_sum = self.pi_sum[info]
+        actions = self.info_actions[info]
+        all_sum = sum(pi_sum.values())
+        if all_sum <= 0:
+            return {action:1/len(actions) for action in actions}
+        return {action:pi_sum[action] / all_sum for action in actions}
+
     def update_pi(self, info):
         move_to_regret = self.regret[info]
         all_regret = 0
@@ -24,45 +126,158 @@ class StrategyState(object):
                 positive_regret[move] = regret
             else:
                 positive_regret[move] = 0
+        actions = self.info_actions[info]
         if all_regret <= 0:
-            self.pi[info] = {action:1/len(self.action_list) for action in self.action_list}
+            self.pi[info] = {action:1/len(actions) for action in actions}
         else:
-            self.pi[info] = {action:positive_regret[action] / all_regret for action in self.action_list}
+            self.pi[info] = {action:positive_regret[action] / all_regret for action in actions}
 
-    def update_regret(self, cfr_node, opponent_p):
+    def update_regret(self, cfr_node, opponent_p, player_p):
+        """
+        Collect the counterfactual regret of cfr_node's moves, weighted by the
+        opponent's reach opponent_p, and add the current strategy to the
+        average weighted by the player's own reach player_p. Regrets are only
+        folded in by end_turn, so the strategy stays fixed for the whole turn.
+        """
         player = cfr_node.state.get_player_next_moved()
         info = cfr_node.state.get_information(player)
-        u_old = cfr_node.utility[player]
-        t = self.info_turn[info]
-        for move, sub_node in cfr_node.sub_nodes.items():
-            regret = self.regret[info][move]
-            u_next = sub_node.utility[player]
-            self.regret[info][move] = (regret * t + opponent_p * (u_next - u_old))/(t+1)
-            #if self.info_list[0] == "nothing":
-                #print(move, opponent_p, u_old, u_next)
-        self.info_turn[info] = t + 1
+        move_utilities = ((move, sub_node.utility[player]) for move, sub_node in cfr_node.sub_nodes.items())
+        self.update_info_regret(info, move_utilities, cfr_node.utility[player], opponent_p, player_p)
+
+    def update_info_regret(self, info, move_utilities, u_old, opponent_p, player_p):
+        """
+        update_regret for an information set given directly: move_utilities
+        are the (move, utility) pairs of the moves walked and u_old is the
+        utility of the node, all from the acting player's viewpoint.
+        """
+        for move, u_next in move_utilities:
+            self.add_regret(info, move, opponent_p * (u_next - u_old))
+        self.add_pi_sum(info, player_p)
+        self.info_turn[info] += 1
+        self.turn_visits[info] += 1
+
+    def is_pruned(self, info, action):
+        return self.prune_until[info][action] > self.turn
+
+    def add_regret(self, info, action, regret):
+        self.regret_delta[info][action] += regret
+
+    def add_pi_sum(self, info, weight):
+        """
+        Add the current strategy of info to the average strategy.
+        """
+        weight *= self.rule.strategy_weight(self.turn)
+        pi = self.pi[info]
+        pi_sum = self.pi_sum[info]
+        for action in self.info_actions[info]:
+            pi_sum[action] += weight * pi[action]
+
+    def end_turn(self):
+        """
+        Finish the current iteration: apply the update rule to the regrets
+        and the average strategy, and compute the strategies of the next
+        iteration from the new regrets (regret matching). Regrets only change
+        here, so the walks read pi as it is.
+        """
+        t = self.turn
+        discount = self.rule.strategy_discount(t)
+        for info in self.info_list:
+            regret = self.regret[info]
+            delta = self.regret_delta[info]
+            pi_sum = self.pi_sum[info]
+            prune_until = self.prune_until[info]
+            for action in self.info_actions[info]:
+                regret[action] = self.rule.accumulate_regret(regret[action], delta[action], t)
+                delta[action] = 0
+                pi_sum[action] *= discount
+                if self.pruning is not None and prune_until[action] <= t:
+                    prune_until[action] = t + 1 + self.pruning.prune_turns(
+                            regret[action], self.info_histories[info])
+            self.turn_visits[info] = 0
+            self.update_pi(info)
+        self.turn = t + 1
 
     def __repr__(self):
         return str(dict(pi=self.pi, regret=self.regret, info_turn=self.info_turn))
 
 
-pi = {1:StrategyState(["head", "tail"], ["sell", "play"]), 2:StrategyState(["nothing"], ["head", "tail"])}
+def game_infos(root_state):
+    """
+    Walk the game from root_state and return, for players 1 and 2, the list
+    of their information sets, the list of moves they can make, both in the
+    order they are first met, {info: legal moves} and {info: number of
+    histories}.
+    """
+    info_list = {1:[], 2:[]}
+    action_list = {1:[], 2:[]}
+    info_actions = {1:{}, 2:{}}
+    info_histories = {1:{}, 2:{}}
+    seen = set()
+    stack = [root_state.clone()]
+    while stack:
+        state = stack.pop()
+        player = state.get_player_next_moved()
+        if player is None:
+            continue
+        moves = state.get_moves()
+        if player != 0:
+            info = state.get_information(player)
+            if (player, info) not in seen:
+                seen.add((player, info))
+                info_list[player].append(info)
+                info_actions[player][info] = list(moves)
+            info_histories[player][info] = info_histories[player].get(info, 0) + 1
+            for move in moves:
+                if move not in action_list[player]:
+                    action_list[player].append(move)
+        for move in reversed(moves):
+            next_state = state.clone()
+            next_state.do_move(move)
+            stack.append(next_state)
+    return info_list, action_list, info_actions, info_histories
+
+
+def new_pi(rule=None, pruning=None, root_state=None):
+    """
+    Strategy tables of both players of the game starting at root_state
+    (CoinToss by default), updated with rule. The information sets of a
+    game_table.TableState are read from its tables.
+    """
+    if root_state is None:
+        root_state = CoinToss()
+    if isinstance(root_state, TableState):
+        infos = root_state.table.game_infos(root_state.index)
+    else:
+        infos = game_infos(root_state)
+    info_list, action_list, info_actions, info_histories = infos
+    return {player:StrategyState(info_list[player], action_list[player], rule, pruning,
+                                 info_actions[player], info_histories[player])
+            for player in [1, 2]}
+
+
+pi = new_pi()
 
 #pi[2].pi = {"nothing":{"head":0.25, "tail":0.75}}
 
 class CFRNode(object):
-    def __init__(self, move=None, parent=None, state=None):
+    def __init__(self, move=None, state=None):
         # the move that got us to this node - 'None' for the root node
         self.move = move
-        # 'None' for the root node
-        self.parent_node = parent
+        # only links down to sub_nodes, so a tree holds no reference cycles
         self.utility = None
         self.sub_nodes = {}
         # the only part of the state that the Node needs later
         self.player_just_moved = state.player_just_moved
         self.state = state
 
-    def walktree(self, p1, p2):
+    def walktree(self, p1, p2, pi=pi, zero_prune=False):
+        """
+        Compute the utilities of this subtree for reach probabilities p1, p2
+        and collect regrets into pi. With zero_prune, subtrees that neither
+        player reaches are skipped; moves that pi's regret-based pruning has
+        put aside are skipped while their probability is zero, see
+        RegretPruning.
+        """
         player = self.state.get_player_next_moved()
         if player is None:
             self.utility = {
@@ -72,37 +287,51 @@ class CFRNode(object):
             return
         if player == 0:
             utility = {1:0, 2:0}
-            for move in ["head", "tail"]:
+            moves = self.state.get_moves()
+            pc = 1/len(moves)
+            for move in moves:
                 next_state = self.state.clone()
                 next_state.do_move(move)
-                next_node = CFRNode(move, self, next_state)
-                next_node.walktree(0.5*p1, 0.5*p2)
+                next_node = CFRNode(move, next_state)
+                next_node.walktree(pc*p1, pc*p2, pi, zero_prune)
                 self.sub_nodes[move] = next_node
                 for k in [1,2]:
-                    pk = p1 if k == 2 else p2
-                    utility[k] += 0.5*pk*next_node.utility[k]
+                    utility[k] += pc*next_node.utility[k]
             self.utility = utility
         else:
             info = self.state.get_information(player)
-            pi[player].update_pi(info)
             utility = {1:0, 2:0}
+            # (move, optimistic value) of the pruned moves
+            pruned = []
             for move in self.state.get_moves():
+                pi_action = pi[player].get_pi(info, move)
+                if pi_action == 0:
+                    # the move adds nothing to the utility; its subtree is
+                    # still needed for the regrets unless pruned
+                    if zero_prune and (p1 if player == 2 else p2) == 0:
+                        continue
+                    if pi[player].is_pruned(info, move):
+                        next_state = self.state.clone()
+                        next_state.do_move(move)
+                        pruned.append((move, optimistic_value(next_state, player, pi[player].optimistic)))
+                        continue
                 next_state = self.state.clone()
                 next_state.do_move(move)
-                pi_action = pi[player].get_pi(info, move)
-                next_node = CFRNode(move, self, next_state)
+                next_node = CFRNode(move, next_state)
                 if player == 1:
-                    next_node.walktree(p1*pi_action, p2)
+                    next_node.walktree(p1*pi_action, p2, pi, zero_prune)
                 elif player == 2:
-                    next_node.walktree(p1, p2*pi_action)
+                    next_node.walktree(p1, p2*pi_action, pi, zero_prune)
                 self.sub_nodes[move] = next_node
                 for k in [1,2]:
                     utility[k] += pi_action*next_node.utility[k]
             self.utility = utility
+            move_utilities = [(move, sub_node.utility[player]) for move, sub_node in self.sub_nodes.items()]
+            move_utilities += pruned
             if player == 1:
-                pi[player].update_regret(self, p2)
+                pi[player].update_info_regret(info, move_utilities, utility[1], p2, p1)
             else:
-                pi[player].update_regret(self, p1)
+                pi[player].update_info_regret(info, move_utilities, utility[2], p1, p2)
     def __repr__(self):
         if len(self.sub_nodes) == 0:
             return str(self.utility)
@@ -113,10 +342,72 @@ class CFRNode(object):
 
 
 
+def cfr(root_state, iter_max, pi=None, rule=None, target=None, check_every=100,
+        pruning=None, zero_prune=False, checkpoint_dir=None, checkpoint_every=1000,
+        quiet_gc=False, stats=None):
+    """
+    Run iter_max full-tree CFR iterations from root_state and return the
+    strategy tables. A fresh set of tables using rule and pruning is made if
+    pi is None. root_state may be a game_table.TableState, which is walked
+    on its tables.
+    If target is given, stop as soon as the exploitability of the average
+    strategy, measured every check_every iterations, is at most target.
+    If checkpoint_dir is given, a snapshot is written there every
+    checkpoint_every turns and at the end; when pi is None and the
+    directory already has a snapshot, the run resumes from it and only does
+    the iterations left of iter_max.
+    With quiet_gc, the cyclic garbage collector is off during the run, see
+    gc_quiet.py.
+    stats, a cfr_stats.CFRStats, collects metrics of every iteration; the
+    run is silent and unmeasured without it.
+    """
+    # turn of the last snapshot of this run, so the final save does not repeat it
+    saved_turn = None
+    if checkpoint_dir is not None:
+        import cfr_checkpoint
+        if pi is None and cfr_checkpoint.latest_checkpoint(checkpoint_dir) is not None:
+            pi = cfr_checkpoint.load_checkpoint(checkpoint_dir)
+            iter_max -= pi[1].turn - 1
+            saved_turn = pi[1].turn
+    if pi is None:
+        pi = new_pi(rule, pruning, root_state)
+    evaluator = Exploitability(root_state) if target is not None else None
+    with suspend_gc(quiet_gc):
+        for i in range(iter_max):
+            if stats is not None:
+                start = time.perf_counter()
+            root_node = None
+            if isinstance(root_state, TableState):
+                walk_table(root_state.table, root_state.index, 1, 1, pi, zero_prune)
+            else:
+                root_node = CFRNode(state=root_state.clone())
+                root_node.walktree(1, 1, pi, zero_prune)
+            if stats is not None:
+                traversal_seconds = time.perf_counter() - start
+                # the table walk keeps no tree to count
+                nodes = count_nodes(root_node) if root_node is not None else None
+                updates = infoset_updates(pi)
+                start = time.perf_counter()
+            # the tree is only needed for the walk
+            root_node = None
+            for strategy in pi.values():
+                strategy.end_turn()
+            if stats is not None:
+                stats.record(pi, nodes, updates, traversal_seconds, time.perf_counter() - start)
+            if checkpoint_dir is not None and (pi[1].turn - 1) % checkpoint_every == 0:
+                cfr_checkpoint.save_checkpoint(pi, checkpoint_dir)
+                saved_turn = pi[1].turn
+            if evaluator is not None and (i + 1) % check_every == 0:
+                if evaluator.exploitability(pi) <= target:
+                    break
+    if checkpoint_dir is not None and saved_turn != pi[1].turn:
+        cfr_checkpoint.save_checkpoint(pi, checkpoint_dir)
+    return pi
+
+
 if __name__=="__main__":
-    for i in range(100):
-        root_node = CFRNode(state=CoinToss())
-        root_node.walktree(1,1)
-        print(root_node)
-        print(pi[1].pi)
-        print(pi[2].pi, pi[2].regret)
+    from cfr_stats import CFRStats, print_report
+    cfr(CoinToss(), 100, pi=pi, stats=CFRStats(every=10, callback=print_report))
+    print({info:pi[1].get_average_pi(info) for info in pi[1].info_list})
+    print({info:pi[2].get_average_pi(info) for info in pi[2].info_list})
+    print("exploitability", Exploitability(CoinToss()).exploitability(pi))
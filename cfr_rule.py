@@ -0,0 +1,98 @@
+
+class VanillaCFR(object):
+    """
+    Plain CFR update rule: counterfactual regrets are summed as they are and
+    every iteration's strategy is added to the average with the same weight.
+    A StrategyState asks its rule three things on every iteration t (1-based):
+    how to fold the regret of iteration t into the accumulated regret, how
+    much weight the current strategy gets in the average strategy, and by how
+    much the accumulated average strategy is discounted afterwards.
+    """
+
+    def accumulate_regret(self, regret, delta, t):
+        return regret + delta
+
+    def strategy_weight(self, t):
+        return 1
+
+    def strategy_discount(self, t):
+        return 1
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+
+class CFRPlus(VanillaCFR):
+    """
+    CFR+: accumulated regrets are floored at zero after every iteration, so
+    an action that was bad for a long time can come back as soon as it turns
+    good, and the average strategy is weighted linearly by iteration number.
+    The first `delay` iterations are left out of the average.
+    """
+
+    def __init__(self, delay=0):
+        self.delay = delay
+
+    def accumulate_regret(self, regret, delta, t):
+        return max(regret + delta, 0)
+
+    def strategy_weight(self, t):
+        return max(t - self.delay, 0)
+
+
+class DiscountedCFR(VanillaCFR):
+    """
+    Discounted CFR (Brown & Sandholm, 2019). After iteration t positive
+    accumulated regrets are multiplied by t^alpha/(t^alpha+1), negative ones
+    by t^beta/(t^beta+1) and the average strategy by (t/(t+1))^gamma.
+    The defaults alpha=1.5, beta=0, gamma=2 are the ones from the paper.
+    """
+
+    def __init__(self, alpha=1.5, beta=0, gamma=2):
+        self.alpha = alpha
+        self.beta = beta
+        self.gamma = gamma
+
+    def accumulate_regret(self, regret, delta, t):
+        regret += delta
+        if regret > 0:
+            ta = t ** self.alpha
+            return regret * ta / (ta + 1)
+        else:
+            tb = t ** self.beta
+            return regret * tb / (tb + 1)
+
+    def strategy_discount(self, t):
+        return (t / (t + 1)) ** self.gamma
+
+    def __repr__(self):
+        return "%s(alpha=%s, beta=%s, gamma=%s)" % (
+                self.__class__.__name__, self.alpha, self.beta, self.gamma)
+
+
+class LinearCFR(DiscountedCFR):
+    """
+    Linear CFR: iteration t contributes to both the regrets and the average
+    strategy with weight t, i.e. Discounted CFR with alpha=beta=gamma=1.
+    """
+
+    def __init__(self):
+        super(LinearCFR, self).__init__(1, 1, 1)
+
+    def __repr__(self):
+        return self.__class__.__name__
+
+
+RULES = {
+        "cfr": VanillaCFR,
+        "cfr+": CFRPlus,
+        "linear": LinearCFR,
+        "dcfr": DiscountedCFR,
+        }
+
+
+def get_rule(name):
+    """
+    Build an update rule from its short name, e.g. "cfr+".
+    """
+    return RULES[name]()
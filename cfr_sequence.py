@@ -1,65 +1,21 @@
 
 from coin_toss import CoinToss
+from cfr_full import new_pi
+from cfr_stats import CFRStats, count_nodes, infoset_updates, print_report
 import random
 import enum
+import time
 
 
-class StrategyState(object):
-    def __init__(self, info_list, action_list):
-        self.info_list = info_list
-        self.action_list = action_list
-        self.pi = {info:{action:1/len(action_list) for action in action_list} for info in info_list}
-        self.regret = {info:{action:0 for action in action_list} for info in info_list}
-        self.info_turn = {info:0 for info in info_list}
-        self.pi_sum = {info:{action:0 for action in action_list} for info in info_list}
-
-    def get_pi(self, info, action):
-        return self.pi[info][action]
-
-    def update_pi(self, info):
-        move_to_regret = self.regret[info]
-        all_regret = 0
-        positive_regret = {}
-        for move, regret in move_to_regret.items():
-            if regret > 0:
-                all_regret += regret
-                positive_regret[move] = regret
-            else:
-                positive_regret[move] = 0
-        if all_regret <= 0:
-            self.pi[info] = {action:1/len(self.action_list) for action in self.action_list}
-        else:
-            self.pi[info] = {action:positive_regret[action] / all_regret for action in self.action_list}
-        for action in self.action_list:
-            self.pi_sum[info][action] += self.pi[info][action]
-
-    def update_regret(self, cfr_node, opponent_p):
-        player = cfr_node.state.get_player_next_moved()
-        info = cfr_node.state.get_information(player)
-        u_old = cfr_node.utility[player]
-        t = self.info_turn[info]
-        for move, sub_node in cfr_node.sub_nodes.items():
-            regret = self.regret[info][move]
-            u_next = sub_node.utility[player]
-            self.regret[info][move] = (regret * t + opponent_p * (u_next - u_old))/(t+1)
-            #if self.info_list[0] == "nothing":
-                #print(move, opponent_p, u_old, u_next)
-        self.info_turn[info] = t + 1
-
-    def __repr__(self):
-        return str(dict(pi=self.pi, regret=self.regret, info_turn=self.info_turn))
-
-
-pi = {1:StrategyState(["head", "tail"], ["sell", "play"]), 2:StrategyState(["nothing"], ["head", "tail"])}
+pi = new_pi()
 
 #pi[2].pi = {"nothing":{"head":0.25, "tail":0.75}}
 
 class CFRNode(object):
-    def __init__(self, move=None, parent=None, state=None):
+    def __init__(self, move=None, state=None):
         # the move that got us to this node - 'None' for the root node
         self.move = move
-        # 'None' for the root node
-        self.parent_node = parent
+        # only links down to sub_nodes, so a tree holds no reference cycles
         self.utility = None
         self.sub_nodes = {}
         # the only part of the state that the Node needs later
@@ -78,19 +34,18 @@ class CFRNode(object):
             next_state = self.state.clone()
             move = sequence[0]
             next_state.do_move(move)
-            next_node = CFRNode(move, self, next_state)
+            next_node = CFRNode(move, next_state)
             next_node.walktree(p1, p2, sequence[1:])
             self.sub_nodes[move] = next_node
             self.utility = next_node.utility.copy()
         else:
             info = self.state.get_information(player)
-            pi[player].update_pi(info)
             utility = {1:0, 2:0}
             for move in self.state.get_moves():
                 next_state = self.state.clone()
                 next_state.do_move(move)
                 pi_action = pi[player].get_pi(info, move)
-                next_node = CFRNode(move, self, next_state)
+                next_node = CFRNode(move, next_state)
                 if player == 1:
                     next_node.walktree(p1*pi_action, p2, sequence)
                 elif player == 2:
@@ -100,9 +55,9 @@ class CFRNode(object):
                     utility[k] += pi_action*next_node.utility[k]
             self.utility = utility
             if player == 1:
-                pi[player].update_regret(self, p2)
+                pi[player].update_regret(self, p2, p1)
             else:
-                pi[player].update_regret(self, p1)
+                pi[player].update_regret(self, p1, p2)
     def __repr__(self):
         if len(self.sub_nodes) == 0:
             return str(self.utility)
@@ -114,11 +69,19 @@ class CFRNode(object):
 
 
 if __name__=="__main__":
+    stats = CFRStats(every=10, callback=print_report)
     for i in range(100):
+        start = time.perf_counter()
         root_node = CFRNode(state=CoinToss())
         #sequence0 = "head" if i % 2 == 0 else "tail"
         sequence0 = random.choice(["head", "tail"])
         root_node.walktree(1,1, [sequence0])
-        print(sequence0, root_node)
-        print(pi[1].pi_sum)
-        print(pi[2].pi_sum, pi[2].regret)
+        traversal_seconds = time.perf_counter() - start
+        nodes = count_nodes(root_node)
+        updates = infoset_updates(pi)
+        start = time.perf_counter()
+        for strategy in pi.values():
+            strategy.end_turn()
+        stats.record(pi, nodes, updates, traversal_seconds, time.perf_counter() - start)
+    print(pi[1].pi_sum)
+    print(pi[2].pi_sum, pi[2].regret)
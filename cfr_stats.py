@@ -0,0 +1,117 @@
+# Metrics of CFR runs.
+#
+# cfr(..., stats=CFRStats(every, callback)) records, after every iteration,
+# the nodes the walk visited, the information set updates it made and the
+# time spent walking the tree against the time spent in end_turn (applying
+# the update rule to the regrets and regret matching). Every every
+# iterations callback, if any, gets a report() of the totals, the figures of
+# the last iteration, iterations/s and the memory of the strategy tables.
+# Nothing is measured or printed unless a CFRStats is passed.
+
+import sys
+import time
+
+
+def count_nodes(node):
+    """
+    Nodes of a walked CFRNode tree.
+    """
+    count = 0
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(node.sub_nodes.values())
+    return count
+
+
+def infoset_updates(pi):
+    """
+    Information set updates of the current turn, before end_turn.
+    """
+    return sum(sum(strategy.turn_visits.values()) for strategy in pi.values())
+
+
+def table_bytes(pi):
+    """
+    Approximate memory of the per-information-set tables of pi, in bytes:
+    the dicts and the values they hold; the information sets and actions
+    used as keys are shared and not counted.
+    """
+    total = 0
+    for strategy in pi.values():
+        for table in (strategy.pi, strategy.regret, strategy.regret_delta, strategy.pi_sum,
+                      strategy.info_turn, strategy.prune_until, strategy.turn_visits):
+            total += sys.getsizeof(table)
+            for value in table.values():
+                total += sys.getsizeof(value)
+                if isinstance(value, dict):
+                    total += sum(sys.getsizeof(v) for v in value.values())
+    return total
+
+
+class CFRStats(object):
+    """
+    Counters of a CFR run, see the top of this file. callback(report) is
+    called every every iterations.
+    """
+
+    def __init__(self, every=100, callback=None):
+        self.every = every
+        self.callback = callback
+        self.iterations = 0
+        self.nodes = 0
+        self.infoset_updates = 0
+        self.traversal_seconds = 0.0
+        self.update_seconds = 0.0
+        # figures of the last iteration
+        self.last_nodes = 0
+        self.last_infoset_updates = 0
+        self.start = None
+
+    def record(self, pi, nodes, updates, traversal_seconds, update_seconds):
+        """
+        Add an iteration that visited nodes nodes (None if not counted) and
+        made updates information set updates.
+        """
+        if self.start is None:
+            self.start = time.perf_counter() - traversal_seconds - update_seconds
+        self.iterations += 1
+        # unknown once an iteration was not counted
+        if nodes is None or self.nodes is None:
+            self.nodes = None
+        else:
+            self.nodes += nodes
+        self.last_nodes = nodes
+        self.infoset_updates += updates
+        self.last_infoset_updates = updates
+        self.traversal_seconds += traversal_seconds
+        self.update_seconds += update_seconds
+        if self.callback is not None and self.iterations % self.every == 0:
+            self.callback(self.report(pi))
+
+    def report(self, pi):
+        elapsed = time.perf_counter() - self.start if self.start is not None else 0
+        return {
+                "iterations":self.iterations,
+                "turn":pi[1].turn,
+                "nodes":self.nodes,
+                "nodes_per_iteration":self.last_nodes,
+                "infoset_updates":self.infoset_updates,
+                "infoset_updates_per_iteration":self.last_infoset_updates,
+                "traversal_seconds":self.traversal_seconds,
+                "update_seconds":self.update_seconds,
+                "elapsed_seconds":elapsed,
+                "iterations_per_second":self.iterations / elapsed if elapsed > 0 else 0,
+                "table_bytes":table_bytes(pi),
+                }
+
+
+def print_report(report):
+    """
+    A callback printing a report on one line.
+    """
+    print("iteration %(iterations)d: %(nodes_per_iteration)s nodes, "
+          "%(infoset_updates_per_iteration)d infoset updates, "
+          "walk %(traversal_seconds).3fs, update %(update_seconds).3fs, "
+          "%(iterations_per_second).1f it/s, tables %(table_bytes)d bytes" % report)
@@ -132,3 +132,40 @@ class CoinToss(object):
 
 
 
+
+
+class CompactCoinToss(object):
+    """
+    CoinToss with __slots__: clone() copies four fields, states can be
+    hashed, compared and keyed by key(). The rules are CoinToss's own
+    methods.
+    """
+
+    __slots__ = ('player_just_moved', 'coin_toss', 'player1_choice', 'player2_choice')
+
+    __init__ = CoinToss.__init__
+    get_player_next_moved = CoinToss.get_player_next_moved
+    get_information = CoinToss.get_information
+    do_move = CoinToss.do_move
+    get_moves = CoinToss.get_moves
+    get_result = CoinToss.get_result
+
+    def clone(self):
+        st = CompactCoinToss.__new__(CompactCoinToss)
+        st.player_just_moved = self.player_just_moved
+        st.coin_toss = self.coin_toss
+        st.player1_choice = self.player1_choice
+        st.player2_choice = self.player2_choice
+        return st
+
+    def key(self):
+        return (self.player_just_moved, self.coin_toss, self.player1_choice, self.player2_choice)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactCoinToss) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return str({name:getattr(self, name) for name in self.__slots__})
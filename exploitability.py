@@ -0,0 +1,153 @@
+
+# Exploitability of the average strategy of a two-player zero-sum game.
+#
+# The game tree is expanded once into flat, index-based tables when an
+# Exploitability object is made, so each evaluation only walks those tables:
+# one top-down pass computes the reach of the opponent and chance for every
+# node, then a memoized bottom-up pass computes the best response value. The
+# best response picks one move per information set, using the values of all
+# the set's histories weighted by their reach.
+
+from coin_toss import CoinToss
+
+
+class Exploitability(object):
+    """
+    Best response / exploitability evaluator for the game starting at
+    root_state. Chance moves are uniform over get_moves().
+    """
+
+    def __init__(self, root_state):
+        # per node: acting player (None for terminal, 0 for chance)
+        self.player = []
+        # per node: information set of the acting player
+        self.info = []
+        # per node: list of (move, child node index)
+        self.children = []
+        # per node: {1: u1, 2: u2} for terminal nodes
+        self.result = []
+        # per player: {info: [node, ...]}
+        self.info_nodes = {1:{}, 2:{}}
+        self.build(root_state)
+
+    def build(self, root_state):
+        stack = [(root_state.clone(), None, None)]
+        while stack:
+            state, parent, move = stack.pop()
+            n = len(self.player)
+            player = state.get_player_next_moved()
+            self.player.append(player)
+            self.children.append([])
+            if parent is not None:
+                self.children[parent].append((move, n))
+            if player is None:
+                self.info.append(None)
+                self.result.append({1:state.get_result(1), 2:state.get_result(2)})
+                continue
+            self.result.append(None)
+            if player == 0:
+                self.info.append(None)
+            else:
+                info = state.get_information(player)
+                self.info.append(info)
+                self.info_nodes[player].setdefault(info, []).append(n)
+            for next_move in reversed(state.get_moves()):
+                next_state = state.clone()
+                next_state.do_move(next_move)
+                stack.append((next_state, n, next_move))
+
+    def best_response(self, pi, player):
+        """
+        Value of player's best response against the average strategy of the
+        other player in pi, and the best response as {info: move}.
+        """
+        opponent = 3 - player
+        average = {}
+
+        def strategy(info):
+            if info not in average:
+                average[info] = pi[opponent].get_average_pi(info)
+            return average[info]
+
+        # reach of the opponent and chance, top-down; parents come before
+        # their children in the node order
+        reach = [0] * len(self.player)
+        reach[0] = 1
+        for n, p in enumerate(self.player):
+            if p is None or reach[n] == 0:
+                continue
+            children = self.children[n]
+            if p == 0:
+                for move, child in children:
+                    reach[child] = reach[n] / len(children)
+            elif p == player:
+                for move, child in children:
+                    reach[child] = reach[n]
+            else:
+                probs = strategy(self.info[n])
+                for move, child in children:
+                    reach[child] = reach[n] * probs[move]
+
+        value = {}
+        best = {}
+
+        def best_move(info):
+            if info not in best:
+                nodes = self.info_nodes[player][info]
+                action_value = {}
+                for n in nodes:
+                    for move, child in self.children[n]:
+                        action_value[move] = action_value.get(move, 0) + reach[n] * node_value(child)
+                best[info] = max(action_value, key=action_value.get)
+            return best[info]
+
+        def node_value(n):
+            if n in value:
+                return value[n]
+            p = self.player[n]
+            children = self.children[n]
+            if p is None:
+                v = self.result[n][player]
+            elif p == 0:
+                v = sum(node_value(child) for move, child in children) / len(children)
+            elif p == player:
+                move = best_move(self.info[n])
+                v = node_value(dict(children)[move])
+            else:
+                probs = strategy(self.info[n])
+                v = sum(probs[move] * node_value(child) for move, child in children if probs[move] > 0)
+            value[n] = v
+            return v
+
+        v = node_value(0)
+        for info in self.info_nodes[player]:
+            best_move(info)
+        return v, best
+
+    def exploitability(self, pi):
+        """
+        Mean of both players' best response values against pi; zero exactly
+        at a Nash equilibrium of a zero-sum game.
+        """
+        return sum(self.best_response(pi, player)[0] for player in [1, 2]) / 2
+
+    def __repr__(self):
+        return "Exploitability(%d nodes)" % len(self.player)
+
+
+def exploitability(root_state, pi):
+    """
+    Exploitability of pi in the game starting at root_state. Build an
+    Exploitability object instead when calling this repeatedly.
+    """
+    return Exploitability(root_state).exploitability(pi)
+
+
+if __name__=="__main__":
+    from cfr_full import cfr, new_pi
+    root_state = CoinToss()
+    evaluator = Exploitability(root_state)
+    pi = new_pi()
+    for i in range(10):
+        cfr(root_state, 100, pi)
+        print((i + 1) * 100, evaluator.exploitability(pi))
@@ -0,0 +1,369 @@
+# State tables for games small enough to enumerate.
+#
+# compile_game(root_state) walks every state reachable from root_state once
+# and numbers them, the root being 0, in the order a depth-first walk first
+# meets them. Per state it records the player who just moved, the player to
+# move (0 for chance, None when the game is over), the legal moves with the
+# number of the state each one leads to, the id of the acting player's
+# information set (the state itself if the game has no get_information)
+# and, for terminal states, the results of players 1 and 2; per information
+# set it records the legal moves, which are the same in all its states.
+# Per state it also records the optimistic values of players 1 and 2 (see
+# cfr_full.optimistic_value), which regret-based pruning needs.
+# States reached along different paths (transpositions) share one number.
+#
+# TableState plays the game from the tables with the usual state interface,
+# so uct(), UCTSearch, CFRNode.walktree and Exploitability run on it as they
+# are; TableUCTSearch and walk_table are the faster paths that stay with
+# state numbers all the way, and cfr() uses walk_table for a TableState.
+#
+# do_move must be deterministic, with chance as explicit moves of player 0
+# (as in coin_toss.CoinToss, not uct_state.CoinToss). Tables are cached in
+# cache_dir under a key made of the root state's class, its fields (which
+# hold the game parameters, e.g. NimState's chips) and the source of the
+# modules defining the game's classes and the functions they hold, which
+# covers methods borrowed from other classes and module-level helpers, so
+# editing the rules compiles them again.
+
+import hashlib
+import inspect
+import os
+import pickle
+import sys
+import tempfile
+
+from uct import UCTSearch, evaluated_result
+
+
+FORMAT = 3
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "game_tables")
+
+
+def state_key(state):
+    """
+    Hashable value identifying a state: state.key() for the compact states,
+    otherwise its fields with lists made tuples.
+    """
+    key = getattr(state, "key", None)
+    if key is not None:
+        return key()
+    return tuple(sorted((name, _freeze(value)) for name, value in vars(state).items()))
+
+
+def _freeze(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+class GameTable(object):
+    """
+    Integer-indexed tables of every state reachable from a root state.
+    """
+
+    def __init__(self):
+        # per state: player who just moved
+        self.just_moved = []
+        # per state: player to move, 0 for chance, None for terminal
+        self.player = []
+        # per state: tuple of legal moves
+        self.moves = []
+        # per state: tuple of next states, in the order of moves
+        self.children = []
+        # per state: {move: next state}
+        self.transitions = []
+        # per state: index in infos of the acting player's information set, -1 if none
+        self.info = []
+        # information sets, in the order they are first met
+        self.infos = []
+        # per information set: tuple of legal moves
+        self.info_moves = []
+        # per state: (result of player 1, result of player 2) for terminal states
+        self.result = []
+        # per state: (optimistic value of player 1, of player 2)
+        self.optimistic = []
+
+    def __len__(self):
+        return len(self.player)
+
+    def build(self, root_state):
+        index = {}
+        info_index = {}
+        # a state is numbered when first met, and its children are filled
+        # in when it is popped again after them
+        stack = [(root_state.clone(), False)]
+        while stack:
+            state, done = stack.pop()
+            key = state_key(state)
+            if done:
+                n = index[key]
+                children = []
+                for move in self.moves[n]:
+                    next_state = state.clone()
+                    next_state.do_move(move)
+                    children.append(index[state_key(next_state)])
+                self.children[n] = tuple(children)
+                self.transitions[n] = dict(zip(self.moves[n], children))
+                # the children are done before their parent
+                if self.player[n] is None:
+                    self.optimistic[n] = self.result[n]
+                else:
+                    values = [self.optimistic[child] for child in children]
+                    if self.player[n] == 0:
+                        self.optimistic[n] = tuple(sum(v) / len(values) for v in zip(*values))
+                    else:
+                        self.optimistic[n] = tuple(max(v) for v in zip(*values))
+                continue
+            if key in index:
+                continue
+            n = len(self.player)
+            index[key] = n
+            player = state.get_player_next_moved()
+            moves = tuple(state.get_moves() or ()) if player is not None else ()
+            self.just_moved.append(state.player_just_moved)
+            self.player.append(player)
+            self.moves.append(moves)
+            self.children.append(())
+            self.transitions.append({})
+            if player:
+                # in a perfect information game the state is its own information set
+                info = state.get_information(player) if hasattr(state, "get_information") else key
+                if (player, info) not in info_index:
+                    info_index[(player, info)] = len(self.infos)
+                    self.infos.append(info)
+                    self.info_moves.append(moves)
+                self.info.append(info_index[(player, info)])
+            else:
+                self.info.append(-1)
+            self.result.append((state.get_result(1), state.get_result(2)) if player is None else None)
+            self.optimistic.append(None)
+            stack.append((state, True))
+            for move in reversed(moves):
+                next_state = state.clone()
+                next_state.do_move(move)
+                stack.append((next_state, False))
+        return self
+
+    def game_infos(self, root=0):
+        """
+        Same as cfr_full.game_infos for the game from state root, without
+        playing it again.
+        """
+        info_list = {1:[], 2:[]}
+        action_list = {1:[], 2:[]}
+        info_actions = {1:{}, 2:{}}
+        info_histories = {1:{}, 2:{}}
+        histories = self.histories(root)
+        seen = set()
+        for n, player in enumerate(self.player):
+            if not player or not histories[n]:
+                continue
+            info = self.infos[self.info[n]]
+            if self.info[n] not in seen:
+                seen.add(self.info[n])
+                info_list[player].append(info)
+                info_actions[player][info] = list(self.info_moves[self.info[n]])
+            info_histories[player][info] = info_histories[player].get(info, 0) + histories[n]
+            for move in self.moves[n]:
+                if move not in action_list[player]:
+                    action_list[player].append(move)
+        return info_list, action_list, info_actions, info_histories
+
+    def histories(self, root=0):
+        """
+        Per state: the number of histories leading to it from state root.
+        """
+        # post-order of the walk from root, so parents come after children
+        order = []
+        seen = set()
+        stack = [(root, False)]
+        while stack:
+            n, done = stack.pop()
+            if done:
+                order.append(n)
+                continue
+            if n in seen:
+                continue
+            seen.add(n)
+            stack.append((n, True))
+            stack.extend((child, False) for child in self.children[n])
+        counts = [0] * len(self)
+        counts[root] = 1
+        for n in reversed(order):
+            for child in self.children[n]:
+                counts[child] += counts[n]
+        return counts
+
+
+def table_key(root_state):
+    """
+    Cache key of the tables of the game starting at root_state.
+    """
+    cls = type(root_state)
+    modules = set()
+    for base in cls.__mro__[:-1]:
+        modules.add(base.__module__)
+        for value in vars(base).values():
+            if inspect.isfunction(value):
+                modules.add(value.__module__)
+    sources = []
+    for name in sorted(modules):
+        try:
+            sources.append(inspect.getsource(sys.modules[name]))
+        except (KeyError, OSError, TypeError):
+            sources.append(name)
+    text = repr((FORMAT, cls.__module__, cls.__qualname__, state_key(root_state), sources))
+    return "%s-%s" % (cls.__name__, hashlib.md5(text.encode()).hexdigest())
+
+
+def compile_game(root_state, cache_dir=DEFAULT_CACHE_DIR):
+    """
+    Tables of the game starting at root_state, loaded from cache_dir if they
+    were compiled before and saved there otherwise. None for cache_dir
+    compiles without caching.
+    """
+    if cache_dir is None:
+        return GameTable().build(root_state)
+    path = os.path.join(cache_dir, table_key(root_state) + ".pickle")
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            table = GameTable()
+            table.__dict__.update(pickle.load(f))
+            return table
+    table = GameTable().build(root_state)
+    os.makedirs(cache_dir, exist_ok=True)
+    # write aside and rename, so a reader never sees half a file
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        pickle.dump(table.__dict__, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+    return table
+
+
+class TableState(object):
+    """
+    A state of a compiled game: a state number into table.
+    """
+
+    __slots__ = ('table', 'index')
+
+    def __init__(self, table, index=0):
+        self.table = table
+        self.index = index
+
+    @property
+    def player_just_moved(self):
+        return self.table.just_moved[self.index]
+
+    def clone(self):
+        return TableState(self.table, self.index)
+
+    def do_move(self, move):
+        self.index = self.table.transitions[self.index][move]
+
+    def get_moves(self):
+        return list(self.table.moves[self.index])
+
+    def get_player_next_moved(self):
+        return self.table.player[self.index]
+
+    def get_information(self, player):
+        """
+        Information set of player, who must be the player to move.
+        """
+        assert player == self.table.player[self.index]
+        return self.table.infos[self.table.info[self.index]]
+
+    def get_result(self, playerjm):
+        result = self.table.result[self.index]
+        if playerjm == 1 or playerjm == 2:
+            return result[playerjm - 1]
+        return 0
+
+    def __repr__(self):
+        return "TableState(%d)" % self.index
+
+
+class TableUCTSearch(UCTSearch):
+    """
+    UCTSearch from a TableState whose rollouts step through state numbers.
+    With rollout_depth, the evaluator scores the TableState the rollout
+    stops at.
+    """
+
+    def rollout(self, state):
+        children = state.table.children
+        choice = self.rng.choice
+        n = state.index
+        if self.rollout_depth is None:
+            while children[n]:
+                n = choice(children[n])
+            state.index = n
+            return state.get_result
+        for i in range(self.rollout_depth):
+            if not children[n]:
+                break
+            n = choice(children[n])
+        state.index = n
+        if not children[n]:
+            return state.get_result
+        return evaluated_result(state.player_just_moved, self.evaluator(state))
+
+
+def walk_table(table, n, p1, p2, pi, zero_prune=False):
+    """
+    CFRNode.walktree on the tables: the utilities (u1, u2) of state n for
+    reach probabilities p1, p2, collecting regrets into pi.
+    """
+    player = table.player[n]
+    if player is None:
+        return table.result[n]
+    children = table.children[n]
+    u1 = u2 = 0
+    if player == 0:
+        pc = 1/len(children)
+        for child in children:
+            c1, c2 = walk_table(table, child, pc*p1, pc*p2, pi, zero_prune)
+            u1 += pc*c1
+            u2 += pc*c2
+        return u1, u2
+    strategy = pi[player]
+    info = table.infos[table.info[n]]
+    pi_info = strategy.pi[info]
+    move_utilities = []
+    for move, child in zip(table.moves[n], children):
+        pi_action = pi_info[move]
+        if pi_action == 0:
+            if zero_prune and (p1 if player == 2 else p2) == 0:
+                continue
+            if strategy.is_pruned(info, move):
+                move_utilities.append((move, table.optimistic[child][player - 1]))
+                continue
+        if player == 1:
+            c1, c2 = walk_table(table, child, p1*pi_action, p2, pi, zero_prune)
+            move_utilities.append((move, c1))
+        else:
+            c1, c2 = walk_table(table, child, p1, p2*pi_action, pi, zero_prune)
+            move_utilities.append((move, c2))
+        u1 += pi_action*c1
+        u2 += pi_action*c2
+    if player == 1:
+        strategy.update_info_regret(info, move_utilities, u1, p2, p1)
+    else:
+        strategy.update_info_regret(info, move_utilities, u2, p1, p2)
+    return u1, u2
+
+
+if __name__ == "__main__":
+    import time
+    from coin_toss import CoinToss
+    from uct_state import NimState, OXOState, NaivePokerState
+    for name, root_state in [("NimState(15)", NimState(15)), ("OXOState", OXOState()),
+                             ("NaivePokerState", NaivePokerState()), ("CoinToss", CoinToss())]:
+        start = time.perf_counter()
+        table = compile_game(root_state)
+        print("%-16s %6d states %5d infosets %8.3fs" % (
+                name, len(table), len(table.infos), time.perf_counter() - start))
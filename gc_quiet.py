@@ -0,0 +1,28 @@
+# Searches without the cyclic garbage collector.
+#
+# The search trees (uct.Node, ismcts.ISNode, CFRNode) hold no references
+# back to their parents, so they contain no reference cycles and are freed
+# by reference counting alone, as soon as the last reference to the root
+# goes. The cyclic collector still runs every few hundred allocations and
+# scans every live node, which shows up as pauses growing with the tree.
+# Within suspend_gc() it does not run at all; searches with quiet_gc=True
+# use it and drop their tree before leaving it.
+
+import contextlib
+import gc
+
+
+@contextlib.contextmanager
+def suspend_gc(enabled=True):
+    """
+    Disable the cyclic garbage collector in the block, if enabled, and
+    enable it again afterwards if it was on before.
+    """
+    if not enabled or not gc.isenabled():
+        yield
+        return
+    gc.disable()
+    try:
+        yield
+    finally:
+        gc.enable()
@@ -0,0 +1,212 @@
+# Single-observer Information Set Monte Carlo Tree Search (SO-ISMCTS) for
+# games with hidden information, after Cowling, Powley and Whitehouse,
+# "Information Set Monte Carlo Tree Search" (2012).
+#
+# uct() searches a game as if every player could see the whole state. Here
+# the tree is built over the information sets of the player to move at the
+# root instead: every iteration starts from a determinization of the root
+# state, i.e. a clone with the hidden information drawn again consistently
+# with what that player knows (state.clone_and_randomize(player)), and only
+# the moves legal in that determinization are considered on the way down.
+#
+# The iterations can be split across worker processes. Every worker grows
+# its own tree from its own batch of determinizations, with its own random
+# stream (rng.stream(seed, worker)), and the root statistics of all trees are
+# summed to pick the move.
+
+from math import *
+import multiprocessing
+import random
+from rng import get_rng, stream, using_rng
+from uct_state import NaivePokerState
+
+
+class ISNode(object):
+    """
+    A node in the information set tree.
+    Note wins is always from the viewpoint of player_just_moved.
+    """
+
+    def __init__(self, move=None, player_just_moved=None):
+        # the move that got us to this node - 'None' for the root node
+        self.move = move
+        # no link back to the parent, see uct.Node
+        self.child_nodes = []
+        self.wins = 0
+        self.visits = 0
+        # times this node was a legal choice when its parent was selected
+        self.avails = 1
+        # the player who made the move, result is taken from their view
+        self.player_just_moved = player_just_moved
+
+    def get_untried_moves(self, legal_moves):
+        """
+        Return the legal moves of the current determinization that have no
+        child node yet.
+        """
+        tried_moves = [child.move for child in self.child_nodes]
+        return [move for move in legal_moves if move not in tried_moves]
+
+    def uct_select_child(self, legal_moves, exploration=0.7):
+        """
+        Use the UCB1 formula, with the number of times a child was available
+        in place of the parent visits, to select a child among the legal
+        moves. Availability of all legal children is updated.
+        """
+        legal_children = [child for child in self.child_nodes
+                          if child.move in legal_moves]
+        s = max(legal_children, key=lambda c: c.wins / c.visits + exploration * sqrt(
+            log(c.avails) / c.visits))
+        for child in legal_children:
+            child.avails += 1
+        return s
+
+    def add_child(self, m, p):
+        """
+        Add a new child node for move m made by player p.
+        Return the added child node.
+        """
+        n = ISNode(move=m, player_just_moved=p)
+        self.child_nodes.append(n)
+        return n
+
+    def update(self, state):
+        """
+        Update this node - one additional visit and the result from the
+        viewpoint of player_just_moved.
+        """
+        self.visits += 1
+        if self.player_just_moved is not None:
+            self.wins += state.get_result(self.player_just_moved)
+
+    def __repr__(self):
+        return '[M:' + str(self.move) + ' W/V/A:' + str(self.wins) + '/' + \
+               str(self.visits) + '/' + str(self.avails) + ']'
+
+    def tree_to_string(self, indent):
+        s = self.indent_string(indent) + str(self)
+        for c in self.child_nodes:
+            s += c.tree_to_string(indent + 1)
+        return s
+
+    @staticmethod
+    def indent_string(indent):
+        s = '\n'
+        for i in range(1, indent + 1):
+            s += '| '
+        return s
+
+    def children_to_string(self):
+        s = ''
+        for c in self.child_nodes:
+            s += str(c) + '\n'
+        return s
+
+
+def search(root_state, iter_max, rng=None, exploration=0.7):
+    """
+    Grow an information set tree from root_state for iter_max iterations
+    and return its root node. Random numbers come from rng, by default
+    rng.get_rng().
+    """
+    if rng is None:
+        rng = get_rng()
+    root_node = ISNode()
+    observer = root_state.get_player_next_moved()
+
+    for i in range(iter_max):
+        node = root_node
+        path = [node]
+
+        # Determinize
+        state = root_state.clone_and_randomize(observer, rng)
+
+        # Select
+        # node is fully expanded for this determinization and non-terminal
+        while state.get_moves() and not node.get_untried_moves(state.get_moves()):
+            node = node.uct_select_child(state.get_moves(), exploration)
+            path.append(node)
+            state.do_move(node.move)
+
+        # Expand
+        untried_moves = node.get_untried_moves(state.get_moves() or [])
+        if untried_moves:
+            m = rng.choice(untried_moves)
+            player = state.get_player_next_moved()
+            state.do_move(m)
+            node = node.add_child(m, player)
+            path.append(node)
+
+        # Rollout
+        while state.get_moves():
+            state.do_move(rng.choice(state.get_moves()))
+
+        # Backpropagate
+        for node in reversed(path):
+            node.update(state)
+
+    return root_node
+
+
+def search_worker(args):
+    """
+    Worker entry point: search a batch of determinizations and return the
+    root statistics as {move: (visits, wins)}.
+    """
+    root_state, iter_max, seed, worker, exploration = args
+    rng = stream(seed, worker)
+    # states draw from the process-wide source in do_move
+    with using_rng(rng):
+        root_node = search(root_state, iter_max, rng, exploration)
+    return {c.move:(c.visits, c.wins) for c in root_node.child_nodes}
+
+
+def ismcts(root_state, iter_max, verbose=False, workers=1, seed=None, exploration=0.7):
+    """
+    Conduct an ISMCTS search for iter_max iterations starting from
+    root_state, split over workers processes, and return the best move for
+    the player to move at the root. root_state must provide
+    get_player_next_moved and clone_and_randomize.
+    """
+    if seed is None:
+        seed = random.getrandbits(32)
+    counts = [iter_max//workers + (1 if w < iter_max % workers else 0) for w in range(workers)]
+    jobs = [(root_state, counts[w], seed, w, exploration) for w in range(workers) if counts[w] > 0]
+    if workers > 1:
+        with multiprocessing.Pool(workers) as pool:
+            stats = pool.map(search_worker, jobs)
+    else:
+        stats = [search_worker(job) for job in jobs]
+
+    merged = {}
+    for root_stats in stats:
+        for move, (visits, wins) in root_stats.items():
+            v, w = merged.get(move, (0, 0))
+            merged[move] = (v + visits, w + wins)
+
+    if verbose:
+        for move, (visits, wins) in merged.items():
+            print('[M:' + str(move) + ' W/V:' + str(wins) + '/' + str(visits) + ']')
+
+    # return the move that was most visited
+    return max(merged, key=lambda m: merged[m][0])
+
+
+def ismcts_play_game():
+    """
+    Play a sample game of NaivePokerState between two ISMCTS players.
+    """
+    state = NaivePokerState()
+    while state.get_moves():
+        print(str(state))
+        m = ismcts(root_state=state, iter_max=1000, verbose=False)
+        print('Best Move: ' + str(m) + '\n')
+        state.do_move(m)
+    if state.get_result(state.player_just_moved) == 1.0:
+        print('Player ' + str(state.player_just_moved) + ' wins!')
+    else:
+        print('Player ' + str(3 - state.player_just_moved) + ' wins!')
+
+
+if __name__ == "__main__":
+    ismcts_play_game()
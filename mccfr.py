@@ -0,0 +1,274 @@
+
+# Monte Carlo CFR (Lanctot et al., 2009) on top of the StrategyState tables
+# of cfr_full.py. Instead of walking the whole tree every iteration, each
+# traversal samples part of it:
+#
+#   chance   - one chance outcome is sampled, player nodes are fully expanded
+#              (what cfr_sequence.py does with a pre-drawn sequence)
+#   external - for the traversing player every move is expanded, moves of the
+#              opponent and of chance are sampled
+#   outcome  - a single terminal history is sampled, with epsilon-exploration
+#              at the traversing player's nodes
+#
+# All estimates are importance-sampling corrected so the expected regret of a
+# traversal equals the counterfactual regret of a full CFR iteration.
+#
+# A batch of traversals is run per iteration with a fixed strategy and the
+# regrets are averaged over the batch; the batch can be split across worker
+# processes, each with its own random stream derived from (seed, worker, turn).
+
+from coin_toss import CoinToss
+from cfr_full import new_pi
+from exploitability import Exploitability
+from rng import get_rng, stream
+import multiprocessing
+
+
+SAMPLINGS = ["chance", "external", "outcome"]
+
+
+def worker_rng(seed, worker, turn):
+    """
+    Independent, reproducible random stream of a worker for a given turn.
+    """
+    return stream(seed, worker, turn)
+
+
+def sample_index(rng, probs):
+    """
+    Sample an index from the list of probabilities probs.
+    """
+    x = rng.random()
+    acc = 0
+    for i, p in enumerate(probs):
+        acc += p
+        if x < acc:
+            return i
+    return len(probs) - 1
+
+
+class MCCFRSampler(object):
+    """
+    Runs sampled traversals of one kind and adds their regrets and average
+    strategy contributions, scaled by weight, to the tables in pi.
+    """
+
+    def __init__(self, pi, sampling="external", rng=None, epsilon=0.6, weight=1):
+        assert sampling in SAMPLINGS
+        self.pi = pi
+        self.sampling = sampling
+        self.rng = rng if rng is not None else get_rng()
+        self.epsilon = epsilon
+        self.weight = weight
+
+    def strategy(self, state, player):
+        info = state.get_information(player)
+        return info, self.pi[player].pi[info]
+
+    def traverse(self, root_state):
+        if self.sampling == "chance":
+            self.chance_sampling(root_state.clone(), 1, 1)
+        elif self.sampling == "external":
+            for player in [1, 2]:
+                self.external_sampling(root_state.clone(), player)
+        else:
+            for player in [1, 2]:
+                self.outcome_sampling(root_state.clone(), player, 1, 1, 1)
+
+    def chance_sampling(self, state, p1, p2):
+        """
+        Return the utilities of both players below state.
+        """
+        player = state.get_player_next_moved()
+        if player is None:
+            return {1:state.get_result(1), 2:state.get_result(2)}
+        moves = state.get_moves()
+        if player == 0:
+            # the chance probability and the sampling probability cancel out
+            state.do_move(moves[self.rng.randrange(len(moves))])
+            return self.chance_sampling(state, p1, p2)
+        info, pi = self.strategy(state, player)
+        utility = {1:0, 2:0}
+        sub_utility = {}
+        for move in moves:
+            next_state = state.clone()
+            next_state.do_move(move)
+            if player == 1:
+                u = self.chance_sampling(next_state, p1*pi[move], p2)
+            else:
+                u = self.chance_sampling(next_state, p1, p2*pi[move])
+            sub_utility[move] = u[player]
+            for k in [1,2]:
+                utility[k] += pi[move]*u[k]
+        opponent_p, player_p = (p2, p1) if player == 1 else (p1, p2)
+        for move in moves:
+            self.pi[player].add_regret(info, move, self.weight * opponent_p * (sub_utility[move] - utility[player]))
+        self.pi[player].add_pi_sum(info, self.weight * player_p)
+        return utility
+
+    def external_sampling(self, state, traverser):
+        """
+        Return the sampled counterfactual utility of traverser below state.
+        The opponent and chance are sampled from their own distributions, so
+        their reach cancels with the sampling probability.
+        """
+        player = state.get_player_next_moved()
+        if player is None:
+            return state.get_result(traverser)
+        moves = state.get_moves()
+        if player == 0:
+            state.do_move(moves[self.rng.randrange(len(moves))])
+            return self.external_sampling(state, traverser)
+        info, pi = self.strategy(state, player)
+        if player != traverser:
+            # simple averaging at the opponent's nodes
+            self.pi[player].add_pi_sum(info, self.weight)
+            move = moves[sample_index(self.rng, [pi[m] for m in moves])]
+            state.do_move(move)
+            return self.external_sampling(state, traverser)
+        sub_utility = {}
+        utility = 0
+        for move in moves:
+            next_state = state.clone()
+            next_state.do_move(move)
+            sub_utility[move] = self.external_sampling(next_state, traverser)
+            utility += pi[move] * sub_utility[move]
+        for move in moves:
+            self.pi[player].add_regret(info, move, self.weight * (sub_utility[move] - utility))
+        return utility
+
+    def outcome_sampling(self, state, traverser, p_own, p_opp, p_sample):
+        """
+        Sample one terminal history. Return (u, p_tail) where u is the
+        traverser's utility divided by the sampling probability of the whole
+        history and p_tail the reach of the strategy from state to terminal.
+        """
+        player = state.get_player_next_moved()
+        if player is None:
+            return state.get_result(traverser) / p_sample, 1
+        moves = state.get_moves()
+        if player == 0:
+            # chance reach and chance sampling probability cancel out
+            state.do_move(moves[self.rng.randrange(len(moves))])
+            return self.outcome_sampling(state, traverser, p_own, p_opp, p_sample)
+        info, pi = self.strategy(state, player)
+        if player == traverser:
+            eps = self.epsilon
+            probs = [eps/len(moves) + (1-eps)*pi[m] for m in moves]
+        else:
+            probs = [pi[m] for m in moves]
+        i = sample_index(self.rng, probs)
+        move = moves[i]
+        state.do_move(move)
+        if player == traverser:
+            u, p_tail = self.outcome_sampling(state, traverser, p_own*pi[move], p_opp, p_sample*probs[i])
+            w = u * p_opp
+            for m in moves:
+                if m == move:
+                    regret = w * p_tail * (1 - pi[move])
+                else:
+                    regret = -w * p_tail * pi[move]
+                self.pi[player].add_regret(info, m, self.weight * regret)
+        else:
+            u, p_tail = self.outcome_sampling(state, traverser, p_own, p_opp*pi[move], p_sample*probs[i])
+            # stochastically-weighted averaging at the opponent's nodes
+            self.pi[player].add_pi_sum(info, self.weight * p_opp / p_sample)
+        return u, p_tail * pi[move]
+
+
+def clear_delta(pi):
+    """
+    Empty the regret and average strategy tables that a batch adds to.
+    """
+    for strategy in pi.values():
+        for info in strategy.info_list:
+            for action in strategy.info_actions[info]:
+                strategy.regret_delta[info][action] = 0
+                strategy.pi_sum[info][action] = 0
+
+
+def merge_delta(pi, delta):
+    for player, (regret_delta, pi_sum) in delta.items():
+        strategy = pi[player]
+        for info in strategy.info_list:
+            for action in strategy.info_actions[info]:
+                strategy.regret_delta[info][action] += regret_delta[info][action]
+                strategy.pi_sum[info][action] += pi_sum[info][action]
+
+
+def sample_batch(args):
+    """
+    Worker entry point: run count traversals on a private copy of pi and
+    return what they added to the tables.
+    """
+    root_state, pi, sampling, epsilon, weight, seed, worker, count = args
+    clear_delta(pi)
+    rng = worker_rng(seed, worker, pi[1].turn)
+    sampler = MCCFRSampler(pi, sampling, rng, epsilon, weight)
+    for i in range(count):
+        sampler.traverse(root_state)
+    return {player:(strategy.regret_delta, strategy.pi_sum) for player, strategy in pi.items()}
+
+
+def mccfr(root_state, iter_max, pi=None, rule=None, sampling="external",
+          batch=1, workers=1, epsilon=0.6, seed=0, target=None, check_every=100,
+          checkpoint_dir=None, checkpoint_every=1000):
+    """
+    Run iter_max MCCFR iterations from root_state and return the strategy
+    tables. Every iteration runs batch sampled traversals with the same
+    strategy, spread over workers processes, then ends the turn.
+    If target is given, stop as soon as the exploitability of the average
+    strategy, measured every check_every iterations, is at most target.
+    Checkpoints work as in cfr_full.cfr; random streams depend on the turn
+    only, so a resumed run samples what the uninterrupted one would have.
+    """
+    # turn of the last snapshot of this run, so the final save does not repeat it
+    saved_turn = None
+    if checkpoint_dir is not None:
+        import cfr_checkpoint
+        if pi is None and cfr_checkpoint.latest_checkpoint(checkpoint_dir) is not None:
+            pi = cfr_checkpoint.load_checkpoint(checkpoint_dir)
+            iter_max -= pi[1].turn - 1
+            saved_turn = pi[1].turn
+    if pi is None:
+        pi = new_pi(rule, root_state=root_state)
+    evaluator = Exploitability(root_state) if target is not None else None
+    weight = 1/batch
+    counts = [batch//workers + (1 if w < batch % workers else 0) for w in range(workers)]
+    pool = multiprocessing.Pool(workers) if workers > 1 else None
+    try:
+        for i in range(iter_max):
+            if pool is None:
+                rng = worker_rng(seed, 0, pi[1].turn)
+                sampler = MCCFRSampler(pi, sampling, rng, epsilon, weight)
+                for j in range(batch):
+                    sampler.traverse(root_state)
+            else:
+                jobs = [(root_state, pi, sampling, epsilon, weight, seed, w, counts[w])
+                        for w in range(workers) if counts[w] > 0]
+                for delta in pool.map(sample_batch, jobs):
+                    merge_delta(pi, delta)
+            for strategy in pi.values():
+                strategy.end_turn()
+            if checkpoint_dir is not None and (pi[1].turn - 1) % checkpoint_every == 0:
+                cfr_checkpoint.save_checkpoint(pi, checkpoint_dir)
+                saved_turn = pi[1].turn
+            if evaluator is not None and (i + 1) % check_every == 0:
+                if evaluator.exploitability(pi) <= target:
+                    break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    if checkpoint_dir is not None and saved_turn != pi[1].turn:
+        cfr_checkpoint.save_checkpoint(pi, checkpoint_dir)
+    return pi
+
+
+if __name__=="__main__":
+    for sampling in SAMPLINGS:
+        pi = mccfr(CoinToss(), 2000, sampling=sampling, batch=4)
+        print(sampling)
+        print({info:pi[1].get_average_pi(info) for info in pi[1].info_list})
+        print({info:pi[2].get_average_pi(info) for info in pi[2].info_list})
+        print("exploitability", Exploitability(CoinToss()).exploitability(pi))
@@ -0,0 +1,101 @@
+# Static evaluation of Othello positions, for rollouts cut short with
+# uct(..., rollout_depth=d, evaluator=OthelloEvaluator(size)).
+#
+# The score combines disc difference, mobility, corner occupancy and a
+# positional weight per square. Everything that depends only on the board
+# size (square weights, corner squares, the neighbours of every square) is
+# computed once per evaluator, so an evaluation is a single pass over the
+# board. Mobility is potential mobility, the number of empty squares next
+# to an opponent disc, which needs no move generation. The weighted sum is
+# mapped into (0, 1) with a logistic function, matching the range of
+# OthelloState.get_result.
+
+from math import exp
+
+
+def square_weight(x, y, size):
+    """
+    Positional weight of square (x, y): positive on the edges, negative on
+    the squares next to a corner, which give the corner away. Corners are
+    counted by the corner term instead.
+    """
+    last = size - 1
+    edge_x = x in (0, last)
+    edge_y = y in (0, last)
+    near_x = x in (1, last - 1)
+    near_y = y in (1, last - 1)
+    if edge_x and edge_y:
+        return 0
+    if near_x and near_y:
+        # X-square, diagonal to a corner
+        return -4
+    if (edge_x and near_y) or (edge_y and near_x):
+        # C-square, on an edge next to a corner
+        return -2
+    if edge_x or edge_y:
+        return 2
+    return 0
+
+
+class OthelloEvaluator(object):
+    """
+    Evaluator for OthelloState boards of the given size: called with a
+    state, it returns the expected result of state.player_just_moved.
+    The term weights are relative; scale sets how sharply the sum is
+    pushed towards 0 or 1.
+    """
+
+    def __init__(self, size=8, disc=1.0, mobility=1.0, corner=2.0, position=1.0, scale=3.0):
+        self.size = size
+        self.disc = disc
+        self.mobility = mobility
+        self.corner = corner
+        self.position = position
+        self.scale = scale
+        # squares are numbered x * size + y, the order of the board's
+        # columns flattened
+        self.weights = [square_weight(x, y, size) for x in range(size) for y in range(size)]
+        self.weight_total = sum(abs(w) for w in self.weights)
+        last = size - 1
+        self.corners = [x * size + y for x in (0, last) for y in (0, last)]
+        self.neighbours = []
+        for x in range(size):
+            for y in range(size):
+                self.neighbours.append(tuple((x + dx) * size + y + dy
+                                             for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+                                             if (dx or dy) and 0 <= x + dx < size and 0 <= y + dy < size))
+
+    def __call__(self, state):
+        me = state.player_just_moved
+        other = 3 - me
+        cells = [v for column in state.board for v in column]
+        neighbours = self.neighbours
+        weights = self.weights
+        discs = [0, 0, 0]
+        # empty squares next to a disc of each player, i.e. where the
+        # other player may be able to move
+        frontier = [0, 0, 0]
+        position = 0
+        for i, v in enumerate(cells):
+            if v:
+                discs[v] += 1
+                position += weights[i] if v == me else -weights[i]
+                continue
+            around = {cells[j] for j in neighbours[i]}
+            if me in around:
+                frontier[me] += 1
+            if other in around:
+                frontier[other] += 1
+        corners = 0
+        for i in self.corners:
+            if cells[i] == me:
+                corners += 1
+            elif cells[i] == other:
+                corners -= 1
+        # relative to the whole board rather than to the discs played, so
+        # the disc count matters more as the board fills up
+        score = self.disc * (discs[me] - discs[other]) / len(cells)
+        score += self.mobility * (frontier[other] - frontier[me]) / (frontier[me] + frontier[other] + 1)
+        score += self.corner * corners / 4
+        score += self.position * position / self.weight_total
+        return 1 / (1 + exp(-self.scale * score))
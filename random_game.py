@@ -0,0 +1,84 @@
+import random
+from itertools import permutations
+
+
+class RandomGame(object):
+    """
+    A generated two-player zero-sum imperfect information game, for sizing
+    CFR runs on trees larger than CoinToss.
+    Chance deals one private card out of `cards` to each player, then the
+    players alternately take `rounds` public actions each out of `actions`.
+    At the end the player with the higher card wins the pot, whose size is
+    drawn once per action history from a table seeded with `seed`.
+    Same interface as coin_toss.CoinToss: chance is player 0 and moves
+    uniformly, player 1 acts first after the deal.
+    """
+
+    def __init__(self, cards=3, rounds=2, actions=2, seed=0):
+        self.cards = cards
+        self.rounds = rounds
+        self.actions = actions
+        self.seed = seed
+        self.player_just_moved = None
+        self.deal = None
+        self.history = ()
+        # pot of every action history; shared by all clones
+        rng = random.Random(seed)
+        self.pot = {}
+        histories = [()]
+        for i in range(2 * rounds):
+            histories = [h + (a,) for h in histories for a in range(actions)]
+        for h in histories:
+            self.pot[h] = rng.randint(1, 4)
+
+    def get_player_next_moved(self):
+        if self.player_just_moved is None:
+            return 0
+        if len(self.history) == 2 * self.rounds:
+            return None
+        if self.player_just_moved == 1:
+            return 2
+        return 1
+
+    def get_information(self, player):
+        return (self.deal[player - 1], self.history)
+
+    def clone(self):
+        st = RandomGame.__new__(RandomGame)
+        st.cards = self.cards
+        st.rounds = self.rounds
+        st.actions = self.actions
+        st.seed = self.seed
+        st.pot = self.pot
+        st.player_just_moved = self.player_just_moved
+        st.deal = self.deal
+        st.history = self.history
+        return st
+
+    def do_move(self, move):
+        if self.player_just_moved is None:
+            self.player_just_moved = 0
+            self.deal = move
+        else:
+            self.player_just_moved = 1 if self.player_just_moved != 1 else 2
+            self.history = self.history + (move,)
+
+    def get_moves(self):
+        player = self.get_player_next_moved()
+        if player is None:
+            return None
+        if player == 0:
+            return list(permutations(range(self.cards), 2))
+        return list(range(self.actions))
+
+    def get_result(self, playerjm):
+        pot = self.pot[self.history]
+        winner = 1 if self.deal[0] > self.deal[1] else 2
+        if playerjm == winner:
+            return pot
+        elif playerjm == 3 - winner:
+            return -pot
+        return 0
+
+    def __repr__(self):
+        return "RandomGame(deal=%s, history=%s)" % (self.deal, self.history)
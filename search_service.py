@@ -0,0 +1,341 @@
+# asyncio search service for many concurrent games.
+#
+# Callers await SearchService.request_move(state, iter_max) from as many
+# coroutines as they like. Every search lives in one of a fixed set of worker
+# processes for its whole life, so its tree never has to be shipped back and
+# forth; the service runs all searches in slices of slice_iterations
+# iterations, sending each worker one message per round with the slices of
+# all its searches, plus the searches to start and to drop.
+#
+# A search ends when it has done iter_max iterations or, if a deadline was
+# given, at the end of the first slice after the deadline, with the best move
+# found so far. Cancelling the awaiting task drops the search. An exception
+# raised by a search (e.g. by the game's do_move) is raised to its caller
+# only; if a worker process dies, all the searches it held fail and new
+# searches go to the other workers. request_move raises at once for a state
+# that cannot be pickled.
+#
+# With an engine (see RolloutEngine) a worker runs the slices of all its
+# searches in lock step and hands the leaves of every step to the engine in
+# a single evaluate() call, so an engine that evaluates a batch at once
+# serves many games per call.
+
+import asyncio
+import concurrent.futures
+import itertools
+import multiprocessing
+import os
+import pickle
+
+from rng import set_rng, stream
+from uct import UCTSearch
+
+
+class RolloutEngine(object):
+    """
+    Reference batched engine: evaluate(states) plays every state out at
+    random and returns, for each, a function giving the result from the
+    viewpoint of a player. Engines that evaluate a whole batch in one call
+    offer the same method.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng
+
+    def evaluate(self, states):
+        results = []
+        for state in states:
+            while state.get_moves():
+                state.do_move(self.rng.choice(state.get_moves()))
+            results.append(state.get_result)
+        return results
+
+
+def run_batched(slices, engine):
+    """
+    Run [(search, iterations)] in lock step, evaluating the leaves of each
+    step with one engine call. Return {search: exception} for the searches
+    that raised; they are left out of the following steps. An exception of
+    the engine fails every search of the step.
+    """
+    failed = {}
+    remaining = {search:n for search, n in slices if n > 0}
+    while remaining:
+        leaves = []
+        for search in list(remaining):
+            try:
+                leaves.append((search,) + search.select_expand())
+            except Exception as e:
+                failed[search] = e
+                del remaining[search]
+        if not leaves:
+            break
+        try:
+            results = engine.evaluate([state for search, path, state in leaves])
+        except Exception as e:
+            for search, path, state in leaves:
+                failed[search] = e
+                del remaining[search]
+            continue
+        for (search, path, state), result in zip(leaves, results):
+            try:
+                search.backpropagate(path, result)
+            except Exception as e:
+                failed[search] = e
+                del remaining[search]
+                continue
+            remaining[search] -= 1
+            if remaining[search] == 0:
+                del remaining[search]
+    return failed
+
+
+def picklable(exception):
+    """
+    exception, or a RuntimeError describing it if it cannot be sent back.
+    """
+    try:
+        pickle.dumps(exception)
+        return exception
+    except Exception:
+        return RuntimeError(repr(exception))
+
+
+def worker_main(conn, seed, worker, engine):
+    """
+    Worker process: keep the searches assigned to this worker and answer
+    every message with {"done": {search id: (iterations, best move)},
+    "failed": {search id: exception}}. A search that raised is dropped.
+    """
+    set_rng(stream(seed, worker))
+    if engine is not None and getattr(engine, "rng", True) is None:
+        engine.rng = stream(seed, worker, 0)
+    searches = {}
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        failed = {}
+        for search_id, state in message["start"]:
+            try:
+                searches[search_id] = UCTSearch(state, stream(seed, worker, search_id + 1))
+            except Exception as e:
+                failed[search_id] = e
+        for search_id in message["drop"]:
+            searches.pop(search_id, None)
+        run = [(search_id, n) for search_id, n in message["run"] if search_id in searches]
+        if engine is None:
+            for search_id, n in run:
+                try:
+                    searches[search_id].run(n)
+                except Exception as e:
+                    failed[search_id] = e
+        else:
+            ids = {searches[search_id]:search_id for search_id, n in run}
+            errors = run_batched([(searches[search_id], n) for search_id, n in run], engine)
+            for search, e in errors.items():
+                failed[ids[search]] = e
+        for search_id in failed:
+            searches.pop(search_id, None)
+        done = {}
+        for search_id, n in run:
+            if search_id in searches:
+                search = searches[search_id]
+                try:
+                    done[search_id] = (search.iterations, search.best_move())
+                except Exception as e:
+                    failed[search_id] = e
+                    del searches[search_id]
+        conn.send({"done":done, "failed":{search_id:picklable(e) for search_id, e in failed.items()}})
+    conn.close()
+
+
+class _Worker(object):
+
+    def __init__(self, index, seed, engine):
+        self.index = index
+        self.conn, child_conn = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=worker_main,
+                                               args=(child_conn, seed, index, engine),
+                                               daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.active = []
+        self.starts = []
+        self.drops = []
+        self.wake = asyncio.Event()
+        # set once the process is found dead
+        self.dead = False
+
+    def roundtrip(self, message):
+        self.conn.send(message)
+        return self.conn.recv()
+
+
+class _Search(object):
+
+    def __init__(self, search_id, iter_max, deadline, future, worker):
+        self.search_id = search_id
+        self.iter_max = iter_max
+        self.deadline = deadline
+        self.future = future
+        self.worker = worker
+        self.iterations = 0
+        self.best_move = None
+
+
+class SearchService(object):
+    """
+    Serve UCT searches for many games from worker processes, in slices of
+    slice_iterations iterations. Use as an async context manager, or call
+    start() and close().
+    """
+
+    def __init__(self, workers=None, slice_iterations=100, engine=None, seed=0):
+        self.worker_count = workers or os.cpu_count() or 1
+        self.slice_iterations = slice_iterations
+        self.engine = engine
+        self.seed = seed
+        self.workers = []
+        self.searches = {}
+        self.ids = itertools.count()
+        self.tasks = []
+        self.executor = None
+        self.closing = False
+
+    async def start(self):
+        self.executor = concurrent.futures.ThreadPoolExecutor(self.worker_count)
+        self.workers = [_Worker(i, self.seed, self.engine) for i in range(self.worker_count)]
+        self.tasks = [asyncio.ensure_future(self.worker_loop(worker)) for worker in self.workers]
+
+    async def close(self):
+        self.closing = True
+        for worker in self.workers:
+            worker.wake.set()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        for search in list(self.searches.values()):
+            self.searches.pop(search.search_id)
+            search.future.cancel()
+        for worker in self.workers:
+            if not worker.dead and worker.process.is_alive():
+                try:
+                    worker.conn.send(None)
+                except OSError:
+                    # died since
+                    pass
+            worker.process.join()
+            worker.conn.close()
+        self.executor.shutdown()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def request_move(self, state, iter_max, deadline=None):
+        """
+        Search state for iter_max iterations and return the best move.
+        deadline, in seconds from now, ends the search early with the best
+        move so far; cancelling the awaiting task abandons the search.
+        """
+        loop = asyncio.get_running_loop()
+        workers = [w for w in self.workers if not w.dead]
+        if self.closing or not workers:
+            raise RuntimeError("search service is %s" % ("closed" if self.closing else "out of workers"))
+        state = state.clone()
+        # a state that cannot be sent would fail the whole message of its worker
+        pickle.dumps(state)
+        worker = min(workers, key=lambda w: len(w.active) + len(w.starts))
+        search_id = next(self.ids)
+        search = _Search(search_id, iter_max,
+                         None if deadline is None else loop.time() + deadline,
+                         loop.create_future(), worker)
+        self.searches[search_id] = search
+        worker.starts.append((search_id, state))
+        worker.active.append(search_id)
+        worker.wake.set()
+        try:
+            return await search.future
+        except asyncio.CancelledError:
+            self.forget(search)
+            raise
+
+    def forget(self, search):
+        if self.searches.pop(search.search_id, None) is None:
+            return
+        worker = search.worker
+        worker.active.remove(search.search_id)
+        worker.drops.append(search.search_id)
+        worker.wake.set()
+
+    def next_message(self, worker):
+        run = []
+        for search_id in worker.active:
+            search = self.searches[search_id]
+            run.append((search_id, min(self.slice_iterations, search.iter_max - search.iterations)))
+        if not run and not worker.starts and not worker.drops:
+            return None
+        message = {"start":worker.starts, "drop":worker.drops, "run":run}
+        worker.starts = []
+        worker.drops = []
+        return message
+
+    async def worker_loop(self, worker):
+        loop = asyncio.get_running_loop()
+        while not self.closing:
+            message = self.next_message(worker)
+            if message is None:
+                worker.wake.clear()
+                await worker.wake.wait()
+                continue
+            try:
+                replies = await loop.run_in_executor(self.executor, worker.roundtrip, message)
+            except (EOFError, OSError):
+                self.worker_died(worker)
+                return
+            except Exception as e:
+                # the worker may be out of step with us, so it is not used again
+                worker.process.terminate()
+                self.worker_died(worker, e)
+                return
+            now = loop.time()
+            for search_id, e in replies["failed"].items():
+                search = self.searches.get(search_id)
+                if search is not None:
+                    self.forget(search)
+                    if not search.future.done():
+                        search.future.set_exception(e)
+            for search_id, (iterations, best_move) in replies["done"].items():
+                search = self.searches.get(search_id)
+                if search is None:
+                    # cancelled while the slice ran
+                    continue
+                search.iterations = iterations
+                search.best_move = best_move
+                if iterations >= search.iter_max or \
+                        (search.deadline is not None and now >= search.deadline):
+                    self.forget(search)
+                    if not search.future.done():
+                        search.future.set_result(best_move)
+
+    def worker_died(self, worker, cause=None):
+        """
+        Fail the searches of a worker whose process is gone, or was stopped
+        because talking to it raised cause.
+        """
+        worker.dead = True
+        # the pipe is closed, so the process is gone or going
+        worker.process.join(1)
+        if cause is None:
+            reason = "died (exit code %s)" % worker.process.exitcode
+        else:
+            reason = "stopped after %r" % cause
+        for search_id in list(worker.active):
+            search = self.searches.pop(search_id)
+            worker.active.remove(search_id)
+            if not search.future.done():
+                search.future.set_exception(RuntimeError("search worker %d %s" % (worker.index, reason)))
+        worker.starts = []
+        worker.drops = []
@@ -24,7 +24,8 @@
 # check out our web site at www.mcts.ai
 
 from math import *
-import random
+from gc_quiet import suspend_gc
+from rng import get_rng, using_rng
 from uct_state import CoinToss
 
 
@@ -35,11 +36,11 @@ class Node(object):
     Crashes if state not specified.
     """
 
-    def __init__(self, move=None, parent=None, state=None):
+    def __init__(self, move=None, state=None):
         # the move that got us to this node - 'None' for the root node
         self.move = move
-        # 'None' for the root node
-        self.parent_node = parent
+        # no link back to the parent, so a tree holds no reference cycles;
+        # the search keeps the path it took instead
         self.child_nodes = []
         self.wins = 0
         self.visits = 0
@@ -64,7 +65,7 @@ class Node(object):
         Remove m from untried_moves and add a new child node for this move.
         Return the added child node.
         """
-        n = Node(move=m, parent=self, state=s)
+        n = Node(move=m, state=s)
         self.untried_moves.remove(m)
         self.child_nodes.append(n)
         return n
@@ -101,57 +102,214 @@ class Node(object):
         return s
 
 
-def uct(root_state, iter_max, verbose=False):
+def evaluated_result(player_just_moved, value):
     """
-    Conduct a UCT search for iter_max iterations starting from root_state.
-    Return the best move from the root_state.
-    Assumes 2 alternating players (player 1 starts),
-    with game results in the range [0.0, 1.0].
+    get_result for a position scored value for player_just_moved, the
+    opponent getting 1 - value.
+    """
+    def get_result(player):
+        return value if player == player_just_moved else 1 - value
+    return get_result
+
+
+class UCTSearch(object):
+    """
+    A UCT search from root_state that can be run a slice of iterations at
+    a time; uct() runs one in a single go.
+    An iteration is select_expand(), rollout() and backpropagate(), so
+    the leaves of several searches can also be gathered and evaluated
+    together by something else than rollout() before backpropagating.
+    The tree has no reference cycles and is freed as soon as the search
+    is dropped.
+    run() and run_sequential_halving() make rng the process-wide source
+    while they run, so states randomizing in do_move or
+    clone_and_randomize draw from it too; callers of select_expand() and
+    rollout() do that themselves if they need it.
     """
 
-    root_node = Node(state=root_state)
+    def __init__(self, root_state, rng=None, rollout_depth=None, evaluator=None):
+        self.root_state = root_state
+        self.root_node = Node(state=root_state)
+        self.rng = rng if rng is not None else get_rng()
+        self.iterations = 0
+        # rollouts stop after rollout_depth plies and the position is scored
+        # by evaluator(state), the expected result in [0, 1] of
+        # state.player_just_moved; None plays every rollout to the end
+        assert rollout_depth is None or evaluator is not None
+        self.rollout_depth = rollout_depth
+        self.evaluator = evaluator
+        # root child picked by run_sequential_halving
+        self.recommended = None
 
-    for i in range(iter_max):
-        node = root_node
-        state = root_state.clone()
+    def select_expand(self, root_child=None):
+        """
+        Descend from the root, through root_child if given, and add one node.
+        Return the path of nodes from the root to the new node (or the
+        terminal node reached) and the state there.
+        """
+        node = self.root_node
+        path = [node]
+        state = self.root_state.clone()
+        if root_child is not None:
+            node = root_child
+            path.append(node)
+            state.do_move(node.move)
 
         # Select
         # node is fully expanded and non-terminal
         while not node.untried_moves and node.child_nodes:
             node = node.uct_select_child()
+            path.append(node)
             state.do_move(node.move)
 
         # Expand
         # if we can expand (i.e. state/node is non-terminal)
         if node.untried_moves:
-            m = random.choice(node.untried_moves)
+            m = self.rng.choice(node.untried_moves)
             state.do_move(m)
             # add child and descend tree
             node = node.add_child(m, state)
+            path.append(node)
+
+        return path, state
 
+    def rollout(self, state):
+        """
+        Play state out at random to the end of the game, or for at most
+        rollout_depth plies. Return the result as a function of the player,
+        as state.get_result.
+        """
         # Rollout - this can often be made orders of magnitude quicker
         # using a state.get_random_move() function
         # while state is non-terminal
-        while state.get_moves():
-            state.do_move(random.choice(state.get_moves()))
+        rng = self.rng
+        if hasattr(state, "get_random_move"):
+            # states offering is_terminal() and get_random_move(rng) play a
+            # ply without building the list of moves
+            plies = 0
+            while not state.is_terminal():
+                if plies == self.rollout_depth:
+                    return evaluated_result(state.player_just_moved, self.evaluator(state))
+                state.do_move(state.get_random_move(rng))
+                plies += 1
+            return state.get_result
+        if self.rollout_depth is None:
+            while state.get_moves():
+                state.do_move(rng.choice(state.get_moves()))
+            return state.get_result
+        for i in range(self.rollout_depth):
+            moves = state.get_moves()
+            if not moves:
+                return state.get_result
+            state.do_move(rng.choice(moves))
+        if not state.get_moves():
+            return state.get_result
+        return evaluated_result(state.player_just_moved, self.evaluator(state))
 
-        # Backpropagate
+    def backpropagate(self, path, get_result):
+        """
+        Update the nodes of path, as returned by select_expand(), with
+        get_result(player), the result of the iteration from the viewpoint
+        of player.
+        """
         # backpropagate from the expanded node and work back to the root node
-        while node is not None:
-            # state is terminal. Update node with result
-            # from POV of node.playerJustMoved
-            node.update(state.get_result(node.player_just_moved))
-            node = node.parent_node
-
-    # Output some information about the tree - can be omitted
-    if verbose:
-        print(root_node.tree_to_string(0))
-    else:
-        print(root_node.children_to_string())
+        for node in reversed(path):
+            # Update node with result from POV of node.playerJustMoved
+            node.update(get_result(node.player_just_moved))
+        self.iterations += 1
+
+    def iterate(self, root_child=None):
+        path, state = self.select_expand(root_child)
+        self.backpropagate(path, self.rollout(state))
+
+    def run(self, iter_max):
+        with using_rng(self.rng):
+            for i in range(iter_max):
+                self.iterate()
 
-    # return the move that was most visited
-    print(root_node.tree_to_string(0))
-    return sorted(root_node.child_nodes, key=lambda c: c.visits)[-1].move
+    def run_sequential_halving(self, iter_max):
+        """
+        Spend iter_max iterations choosing the root move by Sequential
+        Halving (Karnin, Koren and Somekh, 2013; Cazenave, 2014) instead of
+        UCB1: once every root move has a child, the rest of the budget is
+        split into ceil(log2(moves)) rounds, every surviving child gets an
+        equal share of a round, and the worse half by mean result is dropped
+        after each round. Below the root the search is plain UCT. The last
+        survivor becomes the best move.
+        """
+        with using_rng(self.rng):
+            root_node = self.root_node
+            budget = iter_max
+            while root_node.untried_moves and budget > 0:
+                self.iterate()
+                budget -= 1
+            survivors = list(root_node.child_nodes)
+            rounds = ceil(log2(len(survivors))) if len(survivors) > 1 else 0
+            for r in range(rounds):
+                share = budget // (len(survivors) * (rounds - r))
+                for child in survivors:
+                    for i in range(share):
+                        self.iterate(child)
+                budget -= share * len(survivors)
+                survivors.sort(key=lambda c: c.wins / c.visits, reverse=True)
+                survivors = survivors[:ceil(len(survivors) / 2)]
+            # what a round could not split evenly
+            for i in range(budget):
+                self.iterate(survivors[0] if survivors else None)
+            self.recommended = survivors[0] if survivors else None
+
+    def best_move(self):
+        """
+        Return the move that was most visited, or the survivor of
+        Sequential Halving, None before any expansion.
+        """
+        if self.recommended is not None:
+            return self.recommended.move
+        if not self.root_node.child_nodes:
+            return None
+        return sorted(self.root_node.child_nodes, key=lambda c: c.visits)[-1].move
+
+
+ROOT_POLICIES = ["ucb1", "sequential_halving"]
+
+
+def uct(root_state, iter_max, verbose=False, rng=None, rollout_depth=None, evaluator=None,
+        root_policy="ucb1", quiet_gc=False):
+    """
+    Conduct a UCT search for iter_max iterations starting from root_state.
+    Return the best move from the root_state.
+    Assumes 2 alternating players (player 1 starts),
+    with game results in the range [0.0, 1.0].
+    Random moves, and the random events of the game's states, are drawn
+    from rng, by default rng.get_rng().
+    With rollout_depth, rollouts are cut after that many plies and scored
+    by evaluator, e.g. othello_eval.OthelloEvaluator.
+    root_policy "sequential_halving" spreads the budget over the root moves
+    by Sequential Halving rather than UCB1, see
+    UCTSearch.run_sequential_halving.
+    With quiet_gc, the cyclic garbage collector is off during the search
+    and the tree is freed before it is back, see gc_quiet.py.
+    """
+    assert root_policy in ROOT_POLICIES
+    with suspend_gc(quiet_gc):
+        search = UCTSearch(root_state, rng, rollout_depth, evaluator)
+        if root_policy == "sequential_halving":
+            search.run_sequential_halving(iter_max)
+        else:
+            search.run(iter_max)
+        root_node = search.root_node
+
+        # Output some information about the tree - can be omitted
+        if verbose:
+            print(root_node.tree_to_string(0))
+        else:
+            print(root_node.children_to_string())
+
+        # return the move that was most visited
+        print(root_node.tree_to_string(0))
+        move = search.best_move()
+        del search, root_node
+    return move
 
 
 def uct_play_game():
@@ -1,4 +1,4 @@
-import random
+from rng import get_rng
 
 class CoinToss(object):
     """
@@ -36,7 +36,7 @@ class CoinToss(object):
         """
         if self.player_just_moved is None:
             self.player_just_moved = 0
-            self.coin_toss = random.choice(["f", "b"])
+            self.coin_toss = get_rng().choice(["f", "b"])
         elif self.player_just_moved == 0:
             self.player_just_moved = 1
             self.player1_choice = move
@@ -54,7 +54,7 @@ class CoinToss(object):
             return ["sold", "play"]
         if self.player_just_moved == 1:
             if self.player1_choice == "play":
-                return [0, 1]
+                return ["f", "b"]
             elif self.player1_choice == "sold":
                 return None
         if self.player_just_moved == 2:
@@ -115,12 +115,38 @@ class CoinToss(object):
     # for imperfect game
 
     def get_player_next_moved(self):
-        print("not implement...")
-        pass
+        """
+        Get the player to move next: 0 for the toss, None when terminal.
+        """
+        if self.player_just_moved is None:
+            return 0
+        if self.player_just_moved == 0:
+            return 1
+        if self.player_just_moved == 1 and self.player1_choice == "play":
+            return 2
+        return None
 
     def get_information(self, player):
-        print("not implement...")
-        pass
+        """
+        Get what player can observe: player 1 sees the coin, player 2 only
+        sees the choices made.
+        """
+        if player == 1:
+            return (self.coin_toss, self.player1_choice, self.player2_choice)
+        elif player == 2:
+            return (self.player1_choice, self.player2_choice)
+
+    def clone_and_randomize(self, observer, rng=None):
+        """
+        Create a deep clone of this game state, with the information hidden
+        from observer drawn again at random (a determinization).
+        """
+        st = self.clone()
+        if rng is None:
+            rng = get_rng()
+        if observer != 1 and st.coin_toss is not None:
+            st.coin_toss = rng.choice(["f", "b"])
+        return st
 
 
 class GameState(object):
@@ -133,6 +159,9 @@ class GameState(object):
     By convention the players are numbered 1 and 2.
     """
 
+    # no __dict__ for subclasses that declare their own __slots__
+    __slots__ = ()
+
     def __init__(self):
         # At the root pretend the player just moved is player 2
         # so player 1 has the first move
@@ -159,6 +188,21 @@ class GameState(object):
         """
         pass
 
+    def get_player_next_moved(self):
+        """
+        Get the player to move next, None when the game is over.
+        """
+        if not self.get_moves():
+            return None
+        return 3 - self.player_just_moved
+
+    def clone_and_randomize(self, observer, rng=None):
+        """
+        Create a determinization of this state as seen by observer.
+        Nothing is hidden in a perfect information game, so this is a clone.
+        """
+        return self.clone()
+
     def get_result(self, playerjm):
         """
         Get the game result from the viewpoint of playerjm.
@@ -264,6 +308,109 @@ class OXOState(GameState):
         return s
 
 
+class MNKState(GameState):
+    """
+    An m,n,k-game: players alternately claim squares of an m x n board and
+    the first to get k in a row horizontally, vertically or diagonally wins.
+    MNKState(3, 3, 3) is OXO, MNKState(15, 15, 5) is Gomoku.
+    Square i is at row i // n, column i % n; 0 = empty, 1 = player 1 (X),
+    2 = player 2 (O).
+    Unlike OXOState the game stops at the first line. The empty squares and
+    the winner are kept up to date by do_move, which only looks along the
+    lines through the square just played, so finding out whether the game
+    is over or who won takes O(k) rather than a scan of the board.
+    is_terminal and get_random_move let UCTSearch.rollout play a ply in
+    O(k) too, instead of copying the empty squares with get_moves.
+    """
+
+    def __init__(self, m=3, n=3, k=3):
+        super(MNKState, self).__init__()
+        self.m = m
+        self.n = n
+        self.k = k
+        self.board = [0] * (m * n)
+        # the empty squares, and for every square its index in empty
+        self.empty = list(range(m * n))
+        self.empty_pos = list(range(m * n))
+        self.winner = None
+
+    def clone(self):
+        st = MNKState.__new__(MNKState)
+        st.player_just_moved = self.player_just_moved
+        st.m = self.m
+        st.n = self.n
+        st.k = self.k
+        st.board = self.board[:]
+        st.empty = self.empty[:]
+        st.empty_pos = self.empty_pos[:]
+        st.winner = self.winner
+        return st
+
+    def do_move(self, move):
+        assert self.winner is None and self.board[move] == 0
+        self.player_just_moved = 3 - self.player_just_moved
+        self.board[move] = self.player_just_moved
+        # swap the square with the last empty one and drop it
+        i = self.empty_pos[move]
+        last = self.empty.pop()
+        if last != move:
+            self.empty[i] = last
+            self.empty_pos[last] = i
+        if self.is_line(move):
+            self.winner = self.player_just_moved
+
+    def is_line(self, move):
+        """
+        Does the piece at move complete k in a row?
+        """
+        board = self.board
+        player = board[move]
+        m, n, k = self.m, self.n, self.k
+        r, c = divmod(move, n)
+        for (dr, dc) in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+            count = 1
+            for sign in (1, -1):
+                rr, cc = r + sign * dr, c + sign * dc
+                while 0 <= rr < m and 0 <= cc < n and board[rr * n + cc] == player:
+                    count += 1
+                    if count >= k:
+                        return True
+                    rr += sign * dr
+                    cc += sign * dc
+        return count >= k
+
+    def get_moves(self):
+        if self.winner is not None:
+            return []
+        return self.empty[:]
+
+    def is_terminal(self):
+        return self.winner is not None or not self.empty
+
+    def get_random_move(self, rng):
+        """
+        A move drawn uniformly with rng, without copying the empty squares.
+        """
+        return rng.choice(self.empty)
+
+    def get_result(self, playerjm):
+        if self.winner is not None:
+            return 1.0 if self.winner == playerjm else 0.0
+        if not self.empty:
+            # draw
+            return 0.5
+        # Should not be possible to get here
+        assert False
+
+    def __repr__(self):
+        s = ''
+        for i in range(self.m * self.n):
+            s += '.XO'[self.board[i]]
+            if i % self.n == self.n - 1:
+                s += '\n'
+        return s
+
+
 class OthelloState(GameState):
     """
     A state of the game of Othello, i.e. the game board.
@@ -453,6 +600,43 @@ class NaivePokerState(object):
         else:
             return self.p1_pokers.copy()
 
+    def get_player_next_moved(self):
+        if not self.get_moves():
+            return None
+        return 3 - self.player_just_moved
+
+    def get_information(self, player):
+        """
+        Cards are played face down, so a card the opponent is waiting to
+        compare is hidden among the opponent's cards in hand.
+        """
+        if player == 1:
+            own, other = self.p1_pokers, self.p2_pokers
+        else:
+            own, other = self.p2_pokers, self.p1_pokers
+        hidden = list(other)
+        waiting = self.wait_compare
+        if waiting and self.player_just_moved != player:
+            hidden.append(waiting)
+            waiting = "hidden"
+        return (tuple(sorted(own)), tuple(sorted(hidden)), waiting,
+                self.p1_winround, self.p2_winround)
+
+    def clone_and_randomize(self, observer, rng=None):
+        """
+        Create a deep clone of this state with the opponent's face-down card,
+        if any, drawn again from the cards observer cannot tell apart.
+        """
+        st = self.clone()
+        if rng is None:
+            rng = get_rng()
+        if st.wait_compare and st.player_just_moved != observer:
+            other = st.p1_pokers if st.player_just_moved == 1 else st.p2_pokers
+            pool = other + [st.wait_compare]
+            st.wait_compare = pool.pop(rng.randrange(len(pool)))
+            other[:] = pool
+        return st
+
     def get_result(self, playerjm):
         if playerjm == 1:
             if self.p1_winround > self.p2_winround:
@@ -469,4 +653,258 @@ class NaivePokerState(object):
         return "(%s, %s, %s, %s)"%(self.p1_pokers, self.p2_pokers,self.p1_winround, self.p2_winround)
 
 
+# Compact variants of the small games above. They keep the same interface
+# and play exactly the same game, but store only a few integers or strings
+# in __slots__: clone() copies those fields without building any list, and
+# states can be hashed, compared and keyed by key().
+
+
+class CompactCoinToss(object):
+    """
+    CoinToss with __slots__. The rules are CoinToss's own methods.
+    """
+
+    __slots__ = ('player_just_moved', 'coin_toss', 'player1_choice', 'player2_choice')
+
+    __init__ = CoinToss.__init__
+    do_move = CoinToss.do_move
+    get_moves = CoinToss.get_moves
+    get_result = CoinToss.get_result
+    get_player_next_moved = CoinToss.get_player_next_moved
+    get_information = CoinToss.get_information
+    clone_and_randomize = CoinToss.clone_and_randomize
+
+    def clone(self):
+        st = CompactCoinToss.__new__(CompactCoinToss)
+        st.player_just_moved = self.player_just_moved
+        st.coin_toss = self.coin_toss
+        st.player1_choice = self.player1_choice
+        st.player2_choice = self.player2_choice
+        return st
+
+    def key(self):
+        return (self.player_just_moved, self.coin_toss, self.player1_choice, self.player2_choice)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactCoinToss) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    def __repr__(self):
+        return str({name:getattr(self, name) for name in self.__slots__})
+
+
+class CompactNimState(GameState):
+    """
+    NimState with __slots__.
+    """
+
+    __slots__ = ('player_just_moved', 'chips')
+
+    def __init__(self, ch):
+        super(CompactNimState, self).__init__()
+        self.chips = ch
+
+    do_move = NimState.do_move
+    get_moves = NimState.get_moves
+    get_result = NimState.get_result
+    __repr__ = NimState.__repr__
+
+    def clone(self):
+        st = CompactNimState.__new__(CompactNimState)
+        st.player_just_moved = self.player_just_moved
+        st.chips = self.chips
+        return st
+
+    def key(self):
+        return (self.player_just_moved, self.chips)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNimState) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+
+class CompactOXOState(GameState):
+    """
+    OXOState packed into two 9-bit integers: bit i of x is set when
+    player 1 holds square i, bit i of o when player 2 does.
+    """
+
+    __slots__ = ('player_just_moved', 'x', 'o')
+
+    LINES = [(1 << a) | (1 << b) | (1 << c) for (a, b, c) in
+             [(0, 1, 2), (3, 4, 5), (6, 7, 8), (0, 3, 6),
+              (1, 4, 7), (2, 5, 8), (0, 4, 8), (2, 4, 6)]]
+
+    FULL = (1 << 9) - 1
+
+    def __init__(self):
+        super(CompactOXOState, self).__init__()
+        self.x = 0
+        self.o = 0
+
+    def clone(self):
+        st = CompactOXOState.__new__(CompactOXOState)
+        st.player_just_moved = self.player_just_moved
+        st.x = self.x
+        st.o = self.o
+        return st
+
+    def do_move(self, move):
+        bit = 1 << move
+        assert 0 <= move <= 8 and move == int(move) and not (self.x | self.o) & bit
+        self.player_just_moved = 3 - self.player_just_moved
+        if self.player_just_moved == 1:
+            self.x |= bit
+        else:
+            self.o |= bit
+
+    def get_moves(self):
+        empty = ~(self.x | self.o) & self.FULL
+        return [i for i in range(9) if empty >> i & 1]
+
+    def get_result(self, playerjm):
+        for line in self.LINES:
+            if self.x & line == line:
+                return 1.0 if playerjm == 1 else 0.0
+            if self.o & line == line:
+                return 1.0 if playerjm == 2 else 0.0
+        if self.x | self.o == self.FULL:
+            # draw
+            return 0.5
+        # Should not be possible to get here
+        assert False
+
+    @property
+    def board(self):
+        return [1 if self.x >> i & 1 else 2 if self.o >> i & 1 else 0 for i in range(9)]
+
+    def key(self):
+        return (self.player_just_moved, self.x, self.o)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactOXOState) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
+
+    __repr__ = OXOState.__repr__
+
+
+def _cards(mask):
+    """
+    Cards of a hand bitmask, in increasing order.
+    """
+    return [card for card in range(mask.bit_length()) if mask >> card & 1]
+
+
+def _mask(cards):
+    mask = 0
+    for card in cards:
+        mask |= 1 << card
+    return mask
+
+
+class CompactNaivePokerState(object):
+    """
+    NaivePokerState with each hand kept as a bitmask, bit c set when
+    card c is in the hand.
+    """
+
+    __slots__ = ('player_just_moved', 'p1_mask', 'p2_mask', 'p1_winround',
+                 'p2_winround', 'wait_compare')
+
+    def __init__(self):
+        self.player_just_moved = 1
+        self.p1_mask = _mask([1, 3, 5])
+        self.p2_mask = _mask([2, 4, 6])
+        self.p1_winround = 0
+        self.p2_winround = 0
+        self.wait_compare = None
+
+    @property
+    def p1_pokers(self):
+        return _cards(self.p1_mask)
+
+    @property
+    def p2_pokers(self):
+        return _cards(self.p2_mask)
+
+    def clone(self):
+        st = CompactNaivePokerState.__new__(CompactNaivePokerState)
+        st.player_just_moved = self.player_just_moved
+        st.p1_mask = self.p1_mask
+        st.p2_mask = self.p2_mask
+        st.p1_winround = self.p1_winround
+        st.p2_winround = self.p2_winround
+        st.wait_compare = self.wait_compare
+        return st
+
+    def do_move(self, move):
+        bit = 1 << move
+        self.player_just_moved = 3 - self.player_just_moved
+        if self.player_just_moved == 1:
+            assert self.p1_mask & bit
+            self.p1_mask &= ~bit
+            if not self.wait_compare:
+                self.wait_compare = move
+            else:
+                if self.wait_compare < move:
+                    self.p1_winround += 1
+                else:
+                    self.p2_winround += 1
+                self.wait_compare = None
+        else:
+            assert self.p2_mask & bit
+            self.p2_mask &= ~bit
+            if not self.wait_compare:
+                self.wait_compare = move
+            else:
+                if self.wait_compare < move:
+                    self.p2_winround += 1
+                else:
+                    self.p1_winround += 1
+                self.wait_compare = None
+
+    def get_moves(self):
+        if self.player_just_moved == 1:
+            return _cards(self.p2_mask)
+        else:
+            return _cards(self.p1_mask)
+
+    get_player_next_moved = NaivePokerState.get_player_next_moved
+    get_information = NaivePokerState.get_information
+    get_result = NaivePokerState.get_result
+
+    def clone_and_randomize(self, observer, rng=None):
+        """
+        Create a clone of this state with the opponent's face-down card,
+        if any, drawn again from the cards observer cannot tell apart.
+        """
+        st = self.clone()
+        if rng is None:
+            rng = get_rng()
+        if st.wait_compare and st.player_just_moved != observer:
+            other = st.p1_mask if st.player_just_moved == 1 else st.p2_mask
+            pool = _cards(other) + [st.wait_compare]
+            st.wait_compare = pool.pop(rng.randrange(len(pool)))
+            if st.player_just_moved == 1:
+                st.p1_mask = _mask(pool)
+            else:
+                st.p2_mask = _mask(pool)
+        return st
+
+    def key(self):
+        return (self.player_just_moved, self.p1_mask, self.p2_mask,
+                self.p1_winround, self.p2_winround, self.wait_compare)
+
+    def __eq__(self, other):
+        return isinstance(other, CompactNaivePokerState) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
 
+    __repr__ = NaivePokerState.__repr__